@@ -11,12 +11,21 @@
 """
 
 import argparse
-import json
 import os
+import shutil
 import sys
 from pathlib import Path
 from typing import Dict, Optional
 
+from common import save_config
+
+
+# 默认同时进行的翻译请求数
+DEFAULT_CONCURRENCY = 8
+
+# 支持的输入文件格式
+VALID_EXTENSIONS = ['.pdf', '.docx', '.epub']
+
 
 def parse_arguments() -> argparse.Namespace:
     """解析命令行参数"""
@@ -27,6 +36,7 @@ def parse_arguments() -> argparse.Namespace:
     
     parser.add_argument(
         "input_file",
+        type=input_file_type,
         help="输入文件路径 (PDF/DOCX/EPUB)"
     )
     
@@ -53,21 +63,42 @@ def parse_arguments() -> argparse.Namespace:
         help="临时目录路径 (默认: {filename}_temp)"
     )
     
+    parser.add_argument(
+        "-j", "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"同时翻译的页面数 (默认: {DEFAULT_CONCURRENCY})"
+    )
+    
     return parser.parse_args()
 
 
+def input_file_type(file_path: str) -> str:
+    """argparse参数类型：在解析参数时验证输入文件"""
+    if not os.path.exists(file_path):
+        raise argparse.ArgumentTypeError(f"文件不存在: {file_path}")
+    
+    file_ext = Path(file_path).suffix.lower()
+    
+    if file_ext not in VALID_EXTENSIONS:
+        raise argparse.ArgumentTypeError(
+            f"不支持的文件格式: {file_ext} (支持的格式: {', '.join(VALID_EXTENSIONS)})"
+        )
+    
+    return file_path
+
+
 def validate_input_file(file_path: str) -> bool:
     """验证输入文件格式"""
     if not os.path.exists(file_path):
         print(f"错误: 文件不存在: {file_path}")
         return False
     
-    valid_extensions = ['.pdf', '.docx', '.epub']
     file_ext = Path(file_path).suffix.lower()
     
-    if file_ext not in valid_extensions:
+    if file_ext not in VALID_EXTENSIONS:
         print(f"错误: 不支持的文件格式: {file_ext}")
-        print(f"支持的格式: {', '.join(valid_extensions)}")
+        print(f"支持的格式: {', '.join(VALID_EXTENSIONS)}")
         return False
     
     return True
@@ -75,29 +106,13 @@ def validate_input_file(file_path: str) -> bool:
 
 def check_dependencies() -> Dict[str, bool]:
     """检查系统依赖"""
+    # 只需确认命令存在，shutil.which在PATH中查找而不启动子进程
     dependencies = {
-        'claude': False,
-        'pandoc': False,
+        'claude': shutil.which('claude') is not None,
+        'pandoc': shutil.which('pandoc') is not None,
         'python': True  # 已经在运行Python了
     }
     
-    # 检查claude命令
-    try:
-        import subprocess
-        result = subprocess.run(['claude', '--version'], 
-                              capture_output=True, text=True)
-        dependencies['claude'] = result.returncode == 0
-    except FileNotFoundError:
-        dependencies['claude'] = False
-    
-    # 检查pandoc
-    try:
-        result = subprocess.run(['pandoc', '--version'], 
-                              capture_output=True, text=True)
-        dependencies['pandoc'] = result.returncode == 0
-    except FileNotFoundError:
-        dependencies['pandoc'] = False
-    
     return dependencies
 
 
@@ -111,17 +126,10 @@ def create_temp_directory(input_file: str, temp_dir: Optional[str] = None) -> st
     return temp_dir
 
 
-def save_config(config: Dict, temp_dir: str) -> str:
-    """保存配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    with open(config_path, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
-    return config_path
-
-
 def prepare_environment(input_file: str, output_lang: str = "zh", 
                        input_lang: str = "auto", custom_prompt: str = "",
-                       temp_dir: Optional[str] = None) -> Dict:
+                       temp_dir: Optional[str] = None,
+                       concurrency: int = DEFAULT_CONCURRENCY) -> Dict:
     """准备翻译环境"""
     # 验证输入文件
     if not validate_input_file(input_file):
@@ -148,6 +156,7 @@ def prepare_environment(input_file: str, output_lang: str = "zh",
         "input_lang": input_lang,
         "custom_prompt": custom_prompt,
         "temp_dir": os.path.abspath(temp_dir),
+        "concurrency": max(1, concurrency),
         "dependencies": deps
     }
     
@@ -171,7 +180,8 @@ def main():
             output_lang=args.olang,
             input_lang=args.input_lang,
             custom_prompt=args.prompt,
-            temp_dir=args.temp_dir
+            temp_dir=args.temp_dir,
+            concurrency=args.concurrency
         )
         
         print(f"🎯 准备翻译: {config['input_file']}")
@@ -4,28 +4,47 @@
 
 功能：
 - 处理PDF/DOCX/EPUB文件
+- DOCX/EPUB由pandoc直接转换为Markdown，无需经过PDF
 - 按页面拆分文档
 - 提取图片资源
 - 生成markdown文件
 - 支持断点续传
 """
 
-import json
 import os
+import re
 import sys
 from pathlib import Path
 from typing import List, Dict, Optional
 import subprocess
 
+from common import load_config, save_config
 
-def load_config(temp_dir: str) -> Dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"配置文件不存在: {config_path}")
+
+# 可由pandoc直接转换为Markdown的格式
+DIRECT_MARKDOWN_FORMATS = {'.docx', '.epub'}
+
+# 直接转换时单页的最大字符数，过长的章节在段落边界继续拆分
+MAX_PAGE_CHARS = 8000
+
+
+def _run(cmd: List[str]) -> None:
+    """执行外部命令并等待结束，失败时抛出CalledProcessError"""
+    # posix_spawn的启动开销与父进程内存大小无关，不支持的平台回退到subprocess
+    if not hasattr(os, 'posix_spawnp'):
+        subprocess.run(cmd, check=True, close_fds=False)
+        return
     
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    pid = os.posix_spawnp(cmd[0], cmd, os.environ)
+    _, status = os.waitpid(pid, 0)
+    
+    if os.WIFEXITED(status):
+        returncode = os.WEXITSTATUS(status)
+    else:
+        returncode = -os.WTERMSIG(status)
+    
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
 
 
 def get_file_extension(file_path: str) -> str:
@@ -51,11 +70,11 @@ def convert_to_pdf(input_file: str, temp_dir: str) -> str:
         if file_ext == '.docx':
             # 使用pandoc转换DOCX为PDF
             cmd = ['pandoc', input_file, '-o', output_pdf]
-            subprocess.run(cmd, check=True)
+            _run(cmd)
         elif file_ext == '.epub':
             # 使用pandoc转换EPUB为PDF
             cmd = ['pandoc', input_file, '-o', output_pdf]
-            subprocess.run(cmd, check=True)
+            _run(cmd)
         else:
             raise ValueError(f"不支持的文件格式: {file_ext}")
         
@@ -75,7 +94,7 @@ def split_pdf_to_html(pdf_file: str, temp_dir: str) -> List[str]:
     try:
         cmd = ['pdftohtml', '-split', pdf_file, 
                os.path.join(html_dir, "page")]
-        subprocess.run(cmd, check=True)
+        _run(cmd)
         
         # 获取生成的HTML文件列表
         html_files = []
@@ -100,16 +119,19 @@ def organize_images(temp_dir: str) -> Dict[str, str]:
     image_map = {}
     
     # 查找所有图片文件
-    for file in os.listdir(html_dir):
-        if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-            old_path = os.path.join(html_dir, file)
-            new_path = os.path.join(images_dir, file)
+    with os.scandir(html_dir) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
+                continue
+            if not entry.is_file():
+                continue
             
-            # 移动图片到专门的目录
-            if not os.path.exists(new_path):
-                os.rename(old_path, new_path)
+            new_path = os.path.join(images_dir, entry.name)
+            
+            # 移动图片到专门的目录，重新拆分生成的图片覆盖旧文件
+            os.replace(entry.path, new_path)
             
-            image_map[file] = new_path
+            image_map[entry.name] = new_path
     
     print(f"📸 整理图片文件: {len(image_map)} 个")
     return image_map
@@ -124,7 +146,8 @@ def html_to_markdown(html_file: str, output_file: str) -> bool:
     try:
         cmd = ['pandoc', '-f', 'html', '-t', 'markdown', 
                html_file, '-o', output_file]
-        subprocess.run(cmd, check=True)
+        # Python创建的文件描述符默认不可继承，无需逐个关闭
+        subprocess.run(cmd, check=True, close_fds=False)
         return True
         
     except subprocess.CalledProcessError as e:
@@ -132,10 +155,140 @@ def html_to_markdown(html_file: str, output_file: str) -> bool:
         return False
 
 
+def flatten_images(images_dir: str) -> Dict[str, str]:
+    """将pandoc提取到子目录中的图片移动到images目录下，返回每张图片: 原路径 -> images/文件名"""
+    moved = {}
+    
+    for root, _, files in os.walk(images_dir, topdown=False):
+        for file in files:
+            old_path = os.path.join(root, file)
+            new_path = os.path.join(images_dir, file)
+            
+            if root != images_dir:
+                # 不同子目录中的同名图片加上子目录前缀，避免覆盖或丢失
+                if os.path.exists(new_path):
+                    prefix = os.path.relpath(root, images_dir).replace(os.sep, '_')
+                    stem, ext = os.path.splitext(file)
+                    new_path = os.path.join(images_dir, f"{prefix}_{file}")
+                    counter = 1
+                    while os.path.exists(new_path):
+                        new_path = os.path.join(images_dir, f"{prefix}_{stem}_{counter}{ext}")
+                        counter += 1
+                os.rename(old_path, new_path)
+            
+            # 引用统一写成相对临时目录的路径，与临时目录是否为绝对路径无关
+            moved[old_path] = f"images/{os.path.basename(new_path)}"
+        
+        # 删除已清空的子目录
+        if root != images_dir:
+            try:
+                os.rmdir(root)
+            except OSError:
+                pass
+    
+    return moved
+
+
+def rewrite_image_references(markdown_file: str, moved: Dict[str, str]) -> None:
+    """将Markdown中的图片引用改为展平后的新路径"""
+    if not moved:
+        return
+    
+    # 只替换完整的路径，后面紧跟引用结束的括号、引号或空白
+    pattern = re.compile(
+        '(' + '|'.join(re.escape(path) for path in sorted(moved, key=len, reverse=True)) + ')'
+        r'(?=[)"\s])'
+    )
+    
+    with open(markdown_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    content = pattern.sub(lambda match: moved[match.group(1)], content)
+    
+    with open(markdown_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def convert_to_markdown(input_file: str, temp_dir: str) -> str:
+    """使用pandoc将DOCX/EPUB直接转换为完整的Markdown"""
+    full_md = os.path.join(temp_dir, "full.md")
+    
+    if os.path.exists(full_md):
+        print(f"⏭️  跳过转换，Markdown已存在: {full_md}")
+        return full_md
+    
+    images_dir = os.path.join(temp_dir, "images")
+    
+    try:
+        cmd = ['pandoc', input_file, '-t', 'markdown',
+               f'--extract-media={images_dir}', '-o', full_md]
+        _run(cmd)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"转换失败: {e}")
+    
+    # 图片展平到images目录，引用同时改为images/文件名
+    rewrite_image_references(full_md, flatten_images(images_dir))
+    
+    print(f"✅ 转换完成: {full_md}")
+    return full_md
+
+
+def split_markdown_pages(markdown_file: str, temp_dir: str) -> List[str]:
+    """按一级标题拆分Markdown，过长的章节在段落边界继续拆分"""
+    with open(markdown_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    
+    pages = []
+    current = []
+    current_size = 0
+    fence = None
+    
+    for line in lines:
+        stripped = line.lstrip()
+        
+        if fence:
+            # 代码块内部不拆分
+            if stripped.startswith(fence):
+                fence = None
+        elif stripped.startswith(('```', '~~~')):
+            fence = stripped[:3]
+        elif current and (line.startswith('# ') or
+                          (current_size > MAX_PAGE_CHARS and not line.strip())):
+            pages.append(''.join(current))
+            current = []
+            current_size = 0
+        
+        current.append(line)
+        current_size += len(line)
+    
+    if current:
+        pages.append(''.join(current))
+    
+    md_files = []
+    for page in pages:
+        if not page.strip():
+            continue
+        md_file = os.path.join(temp_dir, f"page{len(md_files)+1:04d}.md")
+        with open(md_file, 'w', encoding='utf-8') as f:
+            f.write(page.strip() + '\n')
+        md_files.append(md_file)
+    
+    return md_files
+
+
 def split_document_to_markdown(input_file: str, temp_dir: str) -> List[str]:
     """拆分文档为markdown文件"""
+    from concurrent.futures import ThreadPoolExecutor
+    
     print(f"📄 开始拆分文档: {input_file}")
     
+    # DOCX/EPUB直接转换为Markdown，避免PDF中间格式
+    if get_file_extension(input_file) in DIRECT_MARKDOWN_FORMATS:
+        full_md = convert_to_markdown(input_file, temp_dir)
+        md_files = split_markdown_pages(full_md, temp_dir)
+        print(f"✅ 文档拆分完成，共 {len(md_files)} 个markdown文件")
+        return md_files
+    
     # 转换为PDF（如果需要）
     pdf_file = convert_to_pdf(input_file, temp_dir)
     
@@ -145,14 +298,16 @@ def split_document_to_markdown(input_file: str, temp_dir: str) -> List[str]:
     # 整理图片文件
     organize_images(temp_dir)
     
-    # 转换HTML为Markdown
-    md_files = []
-    for i, html_file in enumerate(html_files):
-        page_num = f"{i+1:04d}"
-        md_file = os.path.join(temp_dir, f"page{page_num}.md")
-        
-        if html_to_markdown(html_file, md_file):
-            md_files.append(md_file)
+    # 转换HTML为Markdown（每页一个pandoc进程，并行执行）
+    page_files = [
+        os.path.join(temp_dir, f"page{i+1:04d}.md")
+        for i in range(len(html_files))
+    ]
+    
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        results = list(pool.map(html_to_markdown, html_files, page_files))
+    
+    md_files = [md_file for md_file, ok in zip(page_files, results) if ok]
     
     print(f"✅ 文档拆分完成，共 {len(md_files)} 个markdown文件")
     return md_files
@@ -178,9 +333,7 @@ def main():
         
         # 更新配置
         config['md_files'] = md_files
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         print(f"🎯 拆分完成: {len(md_files)} 个文件")
         return 0
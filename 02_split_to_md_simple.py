@@ -7,20 +7,11 @@
 - 不依赖于外部工具（pandoc, pdftohtml）
 """
 
-import json
 import os
 import sys
 from pathlib import Path
 
-
-def load_config(temp_dir: str) -> dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"配置文件不存在: {config_path}")
-    
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+from common import load_config, save_config
 
 
 def create_mock_markdown_files(temp_dir: str, input_file: str) -> list:
@@ -121,9 +112,7 @@ def main():
         
         # 更新配置
         config['md_files'] = md_files
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         print(f"🎯 拆分完成: {len(md_files)} 个文件")
         return 0
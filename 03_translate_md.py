@@ -10,20 +10,54 @@
 - 翻译进度显示
 """
 
+import hashlib
 import json
 import os
+import queue
+import random
+import re
 import sys
+import threading
 import time
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Optional, Set, Tuple
 import subprocess
 
+from common import load_config, save_config
 
-def load_config(temp_dir: str) -> Dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+
+# 翻译使用的Claude模型
+CLAUDE_MODEL = 'claude-sonnet-4-20250514'  # 强制使用Claude 4 Sonnet
+
+# 单个常驻会话最多处理的请求数和累计字符数（原文加译文），超过后重启以免上下文无限增长
+SESSION_MAX_REQUESTS = 20
+SESSION_MAX_CHARS = 40000
+
+# 默认同时进行的翻译请求数
+DEFAULT_CONCURRENCY = 8
+
+# Claude输出中需要移除的系统消息行
+SYSTEM_LINE_PATTERN = re.compile(
+    r'^(?:(?:模型：|Model:|```|---).*|.*Generated with Claude.*)(?:\n|\Z)',
+    re.MULTILINE
+)
+
+# 重试等待时间（秒）：指数退避并加随机抖动，避免并发请求同时重试
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 60
+
+# 译文缓存目录，按模型、提示与原文内容的哈希保存，可跨运行、跨书籍复用
+CACHE_DIR = Path.home() / '.cache' / 'trans-books'
+
+# 设置 TRANS_BOOKS_NO_CACHE=1 可关闭译文缓存，强制重新翻译
+CACHE_DISABLED = os.environ.get('TRANS_BOOKS_NO_CACHE', '') not in ('', '0')
+
+# 批量翻译时每次Claude调用包含的页数
+DEFAULT_BATCH_SIZE = 8
+
+# 页面分隔标记，用于在一次调用中拼接多页并拆分翻译结果
+PAGE_MARKER = "<<<PAGE {:04d}>>>"
+PAGE_MARKER_PATTERN = re.compile(r'^<<<PAGE (\d{4})>>>[ \t]*$', re.MULTILINE)
 
 
 def get_output_filename(md_file: str) -> str:
@@ -33,6 +67,76 @@ def get_output_filename(md_file: str) -> str:
     return os.path.join(dir_name, f"output_{base_name}.md")
 
 
+def list_existing_files(directories: Iterable[str]) -> Set[str]:
+    """一次性扫描目录，返回其中已存在文件的路径集合"""
+    existing = set()
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                existing.update(os.path.join(directory, entry.name) for entry in entries)
+        except FileNotFoundError:
+            continue
+    return existing
+
+
+def read_text(path: str) -> str:
+    """直接通过文件描述符读取整个UTF-8文件"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            chunk = os.read(fd, max(size, 1 << 16))
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b''.join(chunks).decode('utf-8')
+
+
+def write_text(path: str, text: str) -> None:
+    """直接通过文件描述符写入整个UTF-8文件"""
+    data = memoryview(text.encode('utf-8'))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+def get_cache_key(prompt: str, content: str, model: str = CLAUDE_MODEL) -> str:
+    """根据模型、翻译提示和原文内容生成缓存键"""
+    return hashlib.sha256(f"{model}\x00{prompt}\x00{content}".encode('utf-8')).hexdigest()
+
+
+def load_cached_translation(cache_key: str) -> Optional[str]:
+    """读取缓存的译文，不存在、为空或缓存已关闭时返回None"""
+    if CACHE_DISABLED:
+        return None
+    try:
+        return read_text(str(CACHE_DIR / cache_key)) or None
+    except OSError:
+        return None
+
+
+def save_cached_translation(cache_key: str, translated_content: str) -> None:
+    """保存译文到缓存，缓存写入失败不影响翻译结果"""
+    # 空译文多半是调用异常，不缓存以免之后一直复用
+    if CACHE_DISABLED or not translated_content.strip():
+        return
+    
+    cache_file = CACHE_DIR / cache_key
+    tmp_file = cache_file.with_name(f"{cache_key}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        write_text(str(tmp_file), translated_content)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"⚠️  写入译文缓存失败: {e}")
+
+
 def construct_translation_prompt(target_lang: str, custom_prompt: str = "") -> str:
     """构造翻译提示"""
     base_prompt = f"请翻译以下内容为{target_lang}，保持markdown格式完整性。"
@@ -43,8 +147,177 @@ def construct_translation_prompt(target_lang: str, custom_prompt: str = "") -> s
     return base_prompt
 
 
+class ClaudeSession:
+    """常驻的Claude进程，通过stream-json在stdin/stdout上复用同一进程"""
+    
+    def __init__(self, system_prompt: str = "", model: str = CLAUDE_MODEL,
+                 max_requests: int = SESSION_MAX_REQUESTS,
+                 max_chars: int = SESSION_MAX_CHARS):
+        self.system_prompt = system_prompt
+        self.model = model
+        self.max_requests = max_requests
+        self.max_chars = max_chars
+        self.process = None
+        self.lines = None
+        self.request_count = 0
+        self.char_count = 0
+    
+    def __enter__(self) -> "ClaudeSession":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def start(self) -> None:
+        """启动Claude进程"""
+        cmd = [
+            'claude', '-p',
+            '--model', self.model,
+            '--input-format', 'stream-json',
+            '--output-format', 'stream-json',
+            '--verbose'
+        ]
+        if self.system_prompt:
+            cmd += ['--append-system-prompt', self.system_prompt]
+        
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+            close_fds=False  # Python创建的文件描述符默认不可继承，无需逐个关闭
+        )
+        self.lines = queue.Queue()
+        self.request_count = 0
+        self.char_count = 0
+        
+        # 后台线程读取输出，便于按超时等待响应
+        reader = threading.Thread(
+            target=self._read_output,
+            args=(self.process.stdout, self.lines),
+            daemon=True
+        )
+        reader.start()
+    
+    @staticmethod
+    def _read_output(stream, lines: "queue.Queue") -> None:
+        for line in stream:
+            lines.put(line)
+        lines.put(None)  # EOF
+    
+    def close(self) -> None:
+        """关闭Claude进程"""
+        if self.process is None:
+            return
+        
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        
+        self.process = None
+    
+    def translate(self, content: str, timeout: int = 300) -> str:
+        """发送一次请求并返回Claude的回复文本"""
+        # 每次请求都会成为同一对话的新一轮，历史过长时换一个新进程
+        if (self.process is None or self.process.poll() is not None
+                or self.request_count >= self.max_requests
+                or self.char_count + len(content) > self.max_chars):
+            self.close()
+            self.start()
+        
+        message = {
+            "type": "user",
+            "message": {
+                "role": "user",
+                "content": [{"type": "text", "text": content}]
+            }
+        }
+        
+        try:
+            self.process.stdin.write(json.dumps(message, ensure_ascii=False) + '\n')
+            self.process.stdin.flush()
+        except OSError:
+            self.close()
+            raise RuntimeError("Claude会话已断开")
+        
+        self.request_count += 1
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            try:
+                line = self.lines.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                # 超时后重启会话，丢弃未完成的响应
+                self.close()
+                raise subprocess.TimeoutExpired('claude', timeout)
+            
+            if line is None:
+                self.close()
+                raise RuntimeError("Claude会话意外退出")
+            
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            
+            if event.get('type') != 'result':
+                continue
+            
+            if event.get('is_error'):
+                raise RuntimeError(event.get('result') or event.get('subtype'))
+            
+            result = event.get('result', '')
+            self.char_count += len(content) + len(result)
+            return result
+
+
+def run_claude(content: str, prompt: str, timeout: int = 300,
+               session: Optional[ClaudeSession] = None) -> str:
+    """调用Claude并返回原始输出，失败时抛出RuntimeError"""
+    # 翻译要求作为系统提示传入，原文单独发送，避免再拼接一份完整内容
+    if session is not None:
+        return session.translate(content, timeout)
+    
+    cmd = [
+        'claude', '-p',
+        '--model', CLAUDE_MODEL,
+        '--append-system-prompt', prompt
+    ]
+    
+    result = subprocess.run(
+        cmd, 
+        input=content,
+        capture_output=True, 
+        text=True, 
+        timeout=timeout,
+        close_fds=False  # Python创建的文件描述符默认不可继承，无需逐个关闭
+    )
+    
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    
+    return result.stdout
+
+
+def get_retry_delay(attempt: int) -> float:
+    """计算第attempt次失败后的重试等待时间"""
+    delay = RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, RETRY_BASE_DELAY)
+    return min(RETRY_MAX_DELAY, delay)
+
+
 def translate_with_claude(md_file: str, output_file: str, prompt: str, 
-                         max_retries: int = 3) -> bool:
+                         max_retries: int = 3,
+                         session: Optional[ClaudeSession] = None) -> bool:
     """使用Claude翻译单个markdown文件"""
     
     # 检查是否已翻译
@@ -57,53 +330,45 @@ def translate_with_claude(md_file: str, output_file: str, prompt: str,
     for attempt in range(max_retries):
         try:
             # 读取原文件内容
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = read_text(md_file)
             
             if not content.strip():
                 # 如果文件为空，创建空的输出文件
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write("")
+                write_text(output_file, "")
                 return True
             
-            # 构造Claude命令
-            full_prompt = f"{prompt}\n\n{content}"
-            
-            # 使用Claude进行翻译
-            cmd = [
-                'claude', 
-                '--model', 'claude-sonnet-4-20250514',  # 强制使用Claude 4 Sonnet
-                full_prompt
-            ]
-            
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                timeout=300  # 5分钟超时
-            )
-            
-            if result.returncode == 0:
-                # 提取翻译结果
-                translated_content = extract_translation_content(result.stdout)
-                
-                # 保存翻译结果
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(translated_content)
-                
-                print(f"✅ 翻译完成: {Path(md_file).name}")
+            # 相同提示和内容已翻译过时直接使用缓存
+            cache_key = get_cache_key(prompt, content)
+            cached_content = load_cached_translation(cache_key)
+            if cached_content is not None:
+                write_text(output_file, cached_content)
+                print(f"♻️  使用缓存译文: {Path(md_file).name}")
                 return True
-            else:
-                print(f"❌ 翻译失败 (尝试 {attempt + 1}/{max_retries}): {result.stderr}")
+            
+            # 使用Claude进行翻译（5分钟超时）
+            output = run_claude(content, prompt, timeout=300, session=session)
+            
+            # 提取翻译结果
+            translated_content = extract_translation_content(output)
+            
+            # 保存翻译结果
+            write_text(output_file, translated_content)
+            save_cached_translation(cache_key, translated_content)
+            
+            print(f"✅ 翻译完成: {Path(md_file).name}")
+            return True
                 
+        except RuntimeError as e:
+            print(f"❌ 翻译失败 (尝试 {attempt + 1}/{max_retries}): {e}")
         except subprocess.TimeoutExpired:
             print(f"⏰ 翻译超时 (尝试 {attempt + 1}/{max_retries})")
         except Exception as e:
             print(f"❌ 翻译异常 (尝试 {attempt + 1}/{max_retries}): {e}")
         
         if attempt < max_retries - 1:
-            print(f"⏳ 等待 {(attempt + 1) * 5} 秒后重试...")
-            time.sleep((attempt + 1) * 5)
+            delay = get_retry_delay(attempt)
+            print(f"⏳ 等待 {delay:.1f} 秒后重试...")
+            time.sleep(delay)
     
     print(f"💥 翻译失败，已达最大重试次数: {Path(md_file).name}")
     return False
@@ -111,49 +376,192 @@ def translate_with_claude(md_file: str, output_file: str, prompt: str,
 
 def extract_translation_content(claude_output: str) -> str:
     """从Claude输出中提取翻译内容"""
-    # Claude的输出通常直接就是翻译结果
-    # 如果有特殊格式，在这里处理
+    # Claude的输出通常直接就是翻译结果，只需移除可能的系统消息或元数据行
+    return SYSTEM_LINE_PATTERN.sub('', claude_output.strip()).strip()
+
+
+def construct_batch_content(contents: List[str]) -> str:
+    """构造多页批量翻译内容"""
+    marker_example = PAGE_MARKER.format(1)
+    parts = [
+        f"以下内容包含 {len(contents)} 个页面，每页以形如 {marker_example} 的标记行开头。"
+        "请逐页翻译，并在译文中原样保留每个标记行（单独成行、顺序不变），"
+        "不要输出任何额外说明。"
+    ]
+    for index, content in enumerate(contents, 1):
+        parts.append(f"{PAGE_MARKER.format(index)}\n{content.strip()}")
+    return '\n\n'.join(parts)
+
+
+def split_batch_output(claude_output: str, expected_pages: int) -> Optional[List[str]]:
+    """按页面标记拆分批量翻译结果，无法对齐或有页面译文为空时返回None"""
+    pieces = PAGE_MARKER_PATTERN.split(claude_output)
     
-    lines = claude_output.strip().split('\n')
+    # re.split结果: [前导内容, 页码1, 内容1, 页码2, 内容2, ...]
+    page_numbers = [int(num) for num in pieces[1::2]]
+    if page_numbers != list(range(1, expected_pages + 1)):
+        return None
     
-    # 移除可能的系统消息或元数据
-    content_lines = []
-    skip_next = False
+    # 批量中只有非空原文，空译文说明该页被遗漏，写出后断点续传不会再重试
+    translations = [extract_translation_content(piece) for piece in pieces[2::2]]
+    if not all(translations):
+        return None
     
-    for line in lines:
-        # 跳过明显的系统消息
-        if line.startswith(('模型：', 'Model:', '```', '---')):
-            continue
-        if 'Generated with Claude' in line:
-            continue
-        if skip_next:
-            skip_next = False
-            continue
+    return translations
+
+
+def translate_batch_with_claude(batch: List[Tuple[str, str]], prompt: str,
+                                session: Optional[ClaudeSession] = None) -> bool:
+    """在一次Claude调用中翻译多个markdown文件"""
+    try:
+        # 命中缓存的页面直接写出，只把其余页面交给Claude
+        misses = []
+        for md_file, output_file in batch:
+            content = read_text(md_file)
+            
+            if not content.strip():
+                # 只有空白的页面无需翻译，与逐页翻译一样写出空文件
+                write_text(output_file, "")
+                continue
+            
+            cache_key = get_cache_key(prompt, content)
+            cached_content = load_cached_translation(cache_key)
+            if cached_content is not None:
+                write_text(output_file, cached_content)
+                print(f"♻️  使用缓存译文: {Path(md_file).name}")
+            else:
+                misses.append((md_file, output_file, content, cache_key))
+        
+        if not misses:
+            return True
         
-        content_lines.append(line)
+        names = ', '.join(Path(md_file).name for md_file, *_ in misses)
+        print(f"🤖 批量翻译中 ({len(misses)} 页): {names}")
+        
+        output = run_claude(
+            construct_batch_content([content for _, _, content, _ in misses]),
+            prompt,
+            timeout=300 * len(misses),  # 每页5分钟超时
+            session=session
+        )
+        
+        translations = split_batch_output(output, len(misses))
+        if translations is None:
+            print("⚠️  批量翻译结果无法按页拆分")
+            return False
+        
+        for (md_file, output_file, _, cache_key), translated_content in zip(misses, translations):
+            write_text(output_file, translated_content)
+            save_cached_translation(cache_key, translated_content)
+            print(f"✅ 翻译完成: {Path(md_file).name}")
+        
+        return True
+        
+    except RuntimeError as e:
+        print(f"❌ 批量翻译失败: {e}")
+    except subprocess.TimeoutExpired:
+        print("⏰ 批量翻译超时")
+    except Exception as e:
+        print(f"❌ 批量翻译异常: {e}")
     
-    return '\n'.join(content_lines).strip()
+    return False
 
 
 def translate_markdown_files(md_files: List[str], temp_dir: str, 
-                           target_lang: str = "zh", custom_prompt: str = "") -> List[str]:
+                           target_lang: str = "zh", custom_prompt: str = "",
+                           batch_size: int = DEFAULT_BATCH_SIZE,
+                           concurrency: int = DEFAULT_CONCURRENCY) -> List[str]:
     """批量翻译markdown文件"""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
     
     prompt = construct_translation_prompt(target_lang, custom_prompt)
-    translated_files = []
+    concurrency = max(1, concurrency)
     
     total_files = len(md_files)
-    print(f"📚 开始翻译 {total_files} 个文件...")
+    print(f"📚 开始翻译 {total_files} 个文件 (并发数: {concurrency})...")
     
-    for i, md_file in enumerate(md_files, 1):
-        print(f"\n[{i}/{total_files}] 处理: {Path(md_file).name}")
-        
-        output_file = get_output_filename(md_file)
-        
-        if translate_with_claude(md_file, output_file, prompt):
-            translated_files.append(output_file)
-        else:
-            print(f"⚠️  跳过失败的文件: {Path(md_file).name}")
+    # 扫描一次输出目录，避免逐页检查文件是否已翻译
+    output_files = [get_output_filename(md_file) for md_file in md_files]
+    existing = list_existing_files({str(Path(f).parent) for f in output_files})
+    
+    results = [output_file in existing for output_file in output_files]
+    for md_file, done in zip(md_files, results):
+        if done:
+            print(f"⏭️  跳过已翻译: {Path(md_file).name}")
+    
+    # 收集需要翻译的非空页面，空页面仍走单页逻辑
+    pending = []
+    for md_file, output_file, done in zip(md_files, output_files, results):
+        if done:
+            continue
+        try:
+            size = os.stat(md_file).st_size
+        except OSError:
+            continue
+        if size == 0:
+            continue
+        pending.append((md_file, output_file))
+    
+    # 每个并发请求独占一个常驻Claude进程，会话池同时限制了并发请求数
+    sessions = queue.Queue()
+    for _ in range(concurrency):
+        sessions.put(ClaudeSession(system_prompt=prompt))
+    
+    def run_with_session(func, *args, restart: bool = False):
+        session = sessions.get()
+        try:
+            return func(*args, session=session)
+        finally:
+            if restart:
+                # 批量请求带有页面标记说明且上下文很大，完成后关闭会话，
+                # 后续请求（包括逐页回退）都从新的进程开始
+                session.close()
+            sessions.put(session)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # 多页合并为一次Claude调用，失败时回退到逐页翻译
+            if batch_size > 1:
+                batch_futures = {}
+                for start in range(0, len(pending), batch_size):
+                    batch = pending[start:start + batch_size]
+                    if len(batch) > 1:
+                        future = pool.submit(run_with_session,
+                                             translate_batch_with_claude, batch, prompt,
+                                             restart=True)
+                        batch_futures[future] = batch
+                
+                for future in as_completed(batch_futures):
+                    if future.result():
+                        existing.update(out for _, out in batch_futures[future])
+                    else:
+                        print("↩️  回退到逐页翻译")
+            
+            page_futures = {}
+            for i, (md_file, output_file) in enumerate(zip(md_files, output_files)):
+                if output_file in existing:
+                    results[i] = True
+                    continue
+                future = pool.submit(run_with_session, translate_with_claude,
+                                     md_file, output_file, prompt)
+                page_futures[future] = i
+            
+            for completed, future in enumerate(as_completed(page_futures), 1):
+                i = page_futures[future]
+                name = Path(md_files[i]).name
+                print(f"[{completed}/{len(page_futures)}] 处理完成: {name}")
+                
+                results[i] = future.result()
+                if not results[i]:
+                    print(f"⚠️  跳过失败的文件: {name}")
+    finally:
+        while not sessions.empty():
+            sessions.get().close()
+    
+    # 保持原始页面顺序
+    translated_files = [
+        output_file for output_file, ok in zip(output_files, results) if ok
+    ]
     
     print(f"\n🎯 翻译完成: {len(translated_files)}/{total_files} 个文件")
     return translated_files
@@ -180,14 +588,13 @@ def main():
             config['md_files'],
             temp_dir,
             config.get('output_lang', 'zh'),
-            config.get('custom_prompt', '')
+            config.get('custom_prompt', ''),
+            concurrency=config.get('concurrency', DEFAULT_CONCURRENCY)
         )
         
         # 更新配置
         config['translated_files'] = translated_files
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         if translated_files:
             print(f"🎉 翻译任务完成!")
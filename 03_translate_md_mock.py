@@ -8,19 +8,13 @@
 - 保持与真实翻译脚本相同的接口
 """
 
-import json
 import os
+import re
 import sys
-import time
 from pathlib import Path
-from typing import List, Dict
+from typing import List
 
-
-def load_config(temp_dir: str) -> Dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+from common import load_config, save_config
 
 
 def get_output_filename(md_file: str) -> str:
@@ -30,118 +24,131 @@ def get_output_filename(md_file: str) -> str:
     return os.path.join(dir_name, f"output_{base_name}.md")
 
 
+# 简单的英中翻译映射（用于演示）
+PHRASE_TRANSLATIONS = {
+    "A Study of Machine Learning Applications in Natural Language Processing": "机器学习在自然语言处理中的应用研究",
+    "Abstract": "摘要",
+    "Introduction": "引言",
+    "Methodology": "方法论", 
+    "Results and Discussion": "结果与讨论",
+    "Conclusion": "结论",
+    "Chapter": "章节",
+    "Document Title": "文档标题",
+    "Main Content": "主要内容",
+    "Background": "背景",
+    "Scope of Study": "研究范围",
+    "Data Collection": "数据收集",
+    "This paper presents": "本文提出",
+    "comprehensive review": "全面回顾",
+    "machine learning applications": "机器学习应用",
+    "natural language processing": "自然语言处理",
+    "transformer architectures": "变换器架构",
+    "attention mechanisms": "注意力机制",
+    "modern AI systems": "现代人工智能系统",
+    "deep learning methods": "深度学习方法",
+    "revolutionized": "彻底改变",
+    "understand and generate": "理解和生成",
+    "human language": "人类语言",
+    "systematic literature review": "系统文献综述",
+    "experimental validation": "实验验证",
+    "research papers": "研究论文",
+    "academic papers": "学术论文",
+    "conferences": "会议",
+    "industry research reports": "行业研究报告",
+    "open-source implementations": "开源实现",
+    "benchmarks": "基准测试"
+}
+
+# 常见英文词汇
+WORD_TRANSLATIONS = {
+    "and": "和",
+    "the": "",
+    "of": "的",
+    "in": "在",
+    "to": "到",
+    "for": "为",
+    "with": "与",
+    "by": "通过",
+    "from": "从",
+    "that": "那",
+    "this": "这",
+    "is": "是",
+    "are": "是",
+    "we": "我们",
+    "has": "已经",
+    "have": "有",
+    "been": "被",
+    "over": "超过",
+    "between": "之间",
+    "includes": "包括",
+    "including": "包括",
+    "analysis": "分析",
+    "approach": "方法",
+    "techniques": "技术",
+    "models": "模型",
+    "systems": "系统",
+    "information": "信息",
+    "important": "重要",
+    "necessary": "必要",
+    "content": "内容",
+    "discussed": "讨论",
+    "provides": "提供",
+    "topics": "主题",
+    "detailed": "详细",
+    "discussion": "讨论",
+    "primary": "主要",
+    "covered": "涵盖",
+    "document": "文档",
+    "section": "部分",
+    "summarizes": "总结",
+    "key points": "要点",
+    "final thoughts": "最终想法",
+    "subject matter": "主题内容"
+}
+
+# 所有词组合并为一个正则，长词组优先匹配，整篇内容只扫描一次
+TRANSLATION_MAP = {
+    english.lower(): chinese
+    for mapping in (WORD_TRANSLATIONS, PHRASE_TRANSLATIONS)
+    for english, chinese in mapping.items()
+}
+TRANSLATION_PATTERN = re.compile(
+    r'\b(' + '|'.join(map(re.escape, sorted(TRANSLATION_MAP, key=len, reverse=True))) + r')\b',
+    re.IGNORECASE
+)
+
+# 清理多余空格和标点前空格的正则
+WHITESPACE_PATTERN = re.compile(r'\s+')
+PUNCTUATION_SPACE_PATTERN = re.compile(r'\s+([，。！？])')
+
+# 需要保留英文原文的专业术语
+TECHNICAL_TERMS = [
+    "transformer", "attention", "BERT", "GPT", "RNN", "CNN", "API",
+    "NLP", "AI", "ML", "ACL", "EMNLP", "NAACL"
+]
+TECHNICAL_TERM_PATTERN = re.compile(
+    '(' + '|'.join(TECHNICAL_TERMS) + ')',
+    re.IGNORECASE
+)
+
+
 def mock_translate_content(content: str, target_lang: str = "zh", custom_prompt: str = "") -> str:
     """模拟翻译内容"""
     
-    # 简单的英中翻译映射（用于演示）
-    translations = {
-        "A Study of Machine Learning Applications in Natural Language Processing": "机器学习在自然语言处理中的应用研究",
-        "Abstract": "摘要",
-        "Introduction": "引言",
-        "Methodology": "方法论", 
-        "Results and Discussion": "结果与讨论",
-        "Conclusion": "结论",
-        "Chapter": "章节",
-        "Document Title": "文档标题",
-        "Main Content": "主要内容",
-        "Background": "背景",
-        "Scope of Study": "研究范围",
-        "Data Collection": "数据收集",
-        "This paper presents": "本文提出",
-        "comprehensive review": "全面回顾",
-        "machine learning applications": "机器学习应用",
-        "natural language processing": "自然语言处理",
-        "transformer architectures": "变换器架构",
-        "attention mechanisms": "注意力机制",
-        "modern AI systems": "现代人工智能系统",
-        "deep learning methods": "深度学习方法",
-        "revolutionized": "彻底改变",
-        "understand and generate": "理解和生成",
-        "human language": "人类语言",
-        "systematic literature review": "系统文献综述",
-        "experimental validation": "实验验证",
-        "research papers": "研究论文",
-        "academic papers": "学术论文",
-        "conferences": "会议",
-        "industry research reports": "行业研究报告",
-        "open-source implementations": "开源实现",
-        "benchmarks": "基准测试"
-    }
-    
-    # 开始翻译过程
-    translated_content = content
-    
-    # 应用翻译映射
-    for english, chinese in translations.items():
-        translated_content = translated_content.replace(english, chinese)
-    
-    # 处理一些常见的英文词汇
-    common_replacements = {
-        "and": "和",
-        "the": "",
-        "of": "的",
-        "in": "在",
-        "to": "到",
-        "for": "为",
-        "with": "与",
-        "by": "通过",
-        "from": "从",
-        "that": "那",
-        "this": "这",
-        "is": "是",
-        "are": "是",
-        "we": "我们",
-        "has": "已经",
-        "have": "有",
-        "been": "被",
-        "over": "超过",
-        "between": "之间",
-        "includes": "包括",
-        "including": "包括",
-        "analysis": "分析",
-        "approach": "方法",
-        "techniques": "技术",
-        "models": "模型",
-        "systems": "系统",
-        "information": "信息",
-        "important": "重要",
-        "necessary": "必要",
-        "content": "内容",
-        "discussed": "讨论",
-        "provides": "提供",
-        "topics": "主题",
-        "detailed": "详细",
-        "discussion": "讨论",
-        "primary": "主要",
-        "covered": "涵盖",
-        "document": "文档",
-        "section": "部分",
-        "summarizes": "总结",
-        "key points": "要点",
-        "final thoughts": "最终想法",
-        "subject matter": "主题内容"
-    }
-    
-    # 应用常见词汇替换（只在单词边界处替换）
-    import re
-    for english, chinese in common_replacements.items():
-        pattern = r'\b' + re.escape(english) + r'\b'
-        translated_content = re.sub(pattern, chinese, translated_content, flags=re.IGNORECASE)
+    # 应用翻译映射（只在单词边界处替换）
+    translated_content = TRANSLATION_PATTERN.sub(
+        lambda match: TRANSLATION_MAP[match.group(1).lower()],
+        content
+    )
     
     # 清理多余的空格和标点
-    translated_content = re.sub(r'\s+', ' ', translated_content)
-    translated_content = re.sub(r'\s+([，。！？])', r'\1', translated_content)
+    translated_content = WHITESPACE_PATTERN.sub(' ', translated_content)
+    translated_content = PUNCTUATION_SPACE_PATTERN.sub(r'\1', translated_content)
     
     # 添加自定义提示的效果（如果有）
     if custom_prompt and "专业术语" in custom_prompt:
         # 保留一些专业术语的英文原文
-        technical_terms = [
-            "transformer", "attention", "BERT", "GPT", "RNN", "CNN", "API",
-            "NLP", "AI", "ML", "ACL", "EMNLP", "NAACL"
-        ]
-        for term in technical_terms:
-            pattern = f"({term})"
-            translated_content = re.sub(pattern, r'\1', translated_content, flags=re.IGNORECASE)
+        translated_content = TECHNICAL_TERM_PATTERN.sub(r'\1', translated_content)
     
     return translated_content.strip()
 
@@ -169,6 +176,7 @@ def mock_translate_file(md_file: str, output_file: str, target_lang: str = "zh",
             return True
         
         # 模拟翻译过程（添加一点延迟使其更真实）
+        import time
         time.sleep(0.5)
         
         # 执行模拟翻译
@@ -234,9 +242,7 @@ def main():
         
         # 更新配置
         config['translated_files'] = translated_files
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         if translated_files:
             print(f"🎉 模拟翻译任务完成!")
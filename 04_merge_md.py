@@ -9,69 +9,110 @@
 - 生成最终的合并文件
 """
 
-import json
 import os
+import re
 import sys
+from collections import deque
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Set
 
+from common import load_config, save_config
 
-def load_config(temp_dir: str) -> dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+
+# 匹配markdown图片语法: ![alt](path)
+IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
+
+# 合并时并行预读翻译文件的线程数
+READ_WORKERS = 8
+
+# 从文件路径中提取页码，只匹配最后一级文件名: .../output_pageXXXX.md
+PAGE_NUMBER_PATTERN = re.compile(r'page(\d+)[^/\\]*$', re.IGNORECASE)
 
 
 def sort_translated_files(translated_files: List[str]) -> List[str]:
     """按页面顺序排序翻译后的文件"""
     def extract_page_number(file_path: str) -> int:
         """从文件名中提取页码"""
-        filename = Path(file_path).stem
-        # 文件名格式: output_pageXXXX
-        if 'page' in filename:
-            page_part = filename.split('page')[-1]
-            # 提取数字部分
-            page_num = ''.join(filter(str.isdigit, page_part))
-            return int(page_num) if page_num else 0
-        return 0
+        match = PAGE_NUMBER_PATTERN.search(file_path)
+        return int(match.group(1)) if match else 0
     
     return sorted(translated_files, key=extract_page_number)
 
 
-def fix_image_references(content: str, temp_dir: str) -> str:
-    """修正图片引用路径"""
+def list_image_names(temp_dir: str) -> Set[str]:
+    """一次性扫描images目录，返回其中的图片文件名集合"""
     images_dir = os.path.join(temp_dir, "images")
     
-    # 查找所有图片引用
-    import re
+    if not os.path.isdir(images_dir):
+        return set()
     
-    # 匹配markdown图片语法: ![alt](path)
-    image_pattern = r'!\[([^\]]*)\]\(([^)]+)\)'
+    with os.scandir(images_dir) as entries:
+        return {entry.name for entry in entries if entry.is_file()}
+
+
+def replace_image_path(match: re.Match, image_names: Set[str],
+                       ref_cache: Dict[str, str]) -> str:
+    """修正单个图片引用，结果按引用原文缓存"""
+    reference = match.group(0)
+    cached = ref_cache.get(reference)
+    if cached is not None:
+        return cached
     
-    def replace_image_path(match):
-        alt_text = match.group(1)
-        image_path = match.group(2)
-        
-        # 如果是相对路径，转换为正确的相对路径
-        if not os.path.isabs(image_path):
-            # 检查图片是否存在于images目录
-            image_name = os.path.basename(image_path)
-            full_image_path = os.path.join(images_dir, image_name)
-            
-            if os.path.exists(full_image_path):
-                # 使用相对于输出文件的路径
-                relative_path = os.path.join("images", image_name)
-                return f'![{alt_text}]({relative_path})'
+    result = reference  # 如果无法处理，保持原样
+    alt_text = match.group(1)
+    image_path = match.group(2)
+    
+    # 如果是相对路径，转换为正确的相对路径（网络图片保持原样）
+    if '://' not in image_path and not os.path.isabs(image_path):
+        # 检查图片是否存在于images目录
+        image_name = os.path.basename(image_path)
         
-        return match.group(0)  # 如果无法处理，保持原样
+        if image_name in image_names:
+            # 使用相对于输出文件的路径，HTML中的路径分隔符始终为/
+            result = f'![{alt_text}](images/{image_name})'
+    
+    ref_cache[reference] = result
+    return result
+
+
+def fix_image_references(content: str, temp_dir: str,
+                         image_names: Optional[Set[str]] = None,
+                         ref_cache: Optional[Dict[str, str]] = None) -> str:
+    """修正图片引用路径"""
+    # 大多数页面没有图片，无需启动正则扫描
+    if '![' not in content:
+        return content
+    
+    if image_names is None:
+        image_names = list_image_names(temp_dir)
     
-    return re.sub(image_pattern, replace_image_path, content)
+    # 同一图片引用在多个页面中重复出现时只处理一次
+    if ref_cache is None:
+        ref_cache = {}
+    
+    # 查找并替换所有图片引用
+    replacer = partial(replace_image_path, image_names=image_names, ref_cache=ref_cache)
+    return IMAGE_PATTERN.sub(replacer, content)
+
+
+def read_translated_file(file_path: str) -> Optional[str]:
+    """读取翻译文件内容，文件不存在时返回None"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as infile:
+            return infile.read().strip()
+    except FileNotFoundError:
+        return None
 
 
-def merge_translated_files(temp_dir: str, output_file: str = "output.md") -> str:
+def merge_translated_files(temp_dir: str, output_file: str = "output.md",
+                           config: Optional[dict] = None) -> str:
     """合并翻译后的markdown文件"""
-    config = load_config(temp_dir)
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if config is None:
+        config = load_config(temp_dir)
     
     if 'translated_files' not in config:
         raise ValueError("未找到翻译文件列表")
@@ -86,37 +127,56 @@ def merge_translated_files(temp_dir: str, output_file: str = "output.md") -> str
     
     output_path = os.path.join(temp_dir, output_file)
     
+    # 图片目录只扫描一次，避免每个图片引用都检查文件是否存在
+    image_names = list_image_names(temp_dir)
+    ref_cache = {}
+    
     print(f"📝 开始合并 {len(sorted_files)} 个翻译文件...")
     
     with open(output_path, 'w', encoding='utf-8') as outfile:
-        for i, file_path in enumerate(sorted_files):
-            if not os.path.exists(file_path):
-                print(f"⚠️  警告: 文件不存在，跳过: {file_path}")
-                continue
-            
-            print(f"📄 合并: {Path(file_path).name}")
-            
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8') as infile:
-                content = infile.read().strip()
-            
-            # 修正图片引用
-            content = fix_image_references(content, temp_dir)
-            
-            # 写入内容
-            if content:
-                outfile.write(content)
+        # 先写入元数据，避免合并后再读回整个文件重写
+        write_book_metadata(outfile, config)
+        
+        # 后台线程按顺序预读后续页面，读取与处理、写入重叠进行；
+        # 同时最多预读READ_WORKERS页，避免整本书都读入内存
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+            pending_files = iter(sorted_files)
+            in_flight = deque(
+                pool.submit(read_translated_file, file_path)
+                for file_path in islice(pending_files, READ_WORKERS)
+            )
             
-            # 添加页面分隔符（除了最后一个文件）
-            if i < len(sorted_files) - 1:
-                outfile.write('\n\n---\n\n')
+            for i, file_path in enumerate(sorted_files):
+                content = in_flight.popleft().result()
+                
+                # 每取出一页就补充提交下一页
+                next_file = next(pending_files, None)
+                if next_file is not None:
+                    in_flight.append(pool.submit(read_translated_file, next_file))
+                
+                if content is None:
+                    print(f"⚠️  警告: 文件不存在，跳过: {file_path}")
+                    continue
+                
+                print(f"📄 合并: {Path(file_path).name}")
+                
+                # 修正图片引用
+                content = fix_image_references(content, temp_dir, image_names, ref_cache)
+                
+                # 写入内容
+                if content:
+                    outfile.write(content)
+                
+                # 添加页面分隔符（除了最后一个文件）
+                if i < len(sorted_files) - 1:
+                    outfile.write('\n\n---\n\n')
     
     print(f"✅ 合并完成: {output_path}")
     return output_path
 
 
-def add_book_metadata(merged_file: str, config: dict) -> None:
-    """在合并文件开头添加书籍元数据"""
+def write_book_metadata(outfile, config: dict) -> None:
+    """在合并文件开头写入书籍元数据"""
     
     # 生成元数据
     input_filename = Path(config['input_file']).stem
@@ -132,14 +192,7 @@ def add_book_metadata(merged_file: str, config: dict) -> None:
 
 """
     
-    # 读取原内容
-    with open(merged_file, 'r', encoding='utf-8') as f:
-        original_content = f.read()
-    
-    # 写入元数据和原内容
-    with open(merged_file, 'w', encoding='utf-8') as f:
-        f.write(metadata)
-        f.write(original_content)
+    outfile.write(metadata)
 
 
 def main():
@@ -151,18 +204,15 @@ def main():
     temp_dir = sys.argv[1]
     
     try:
-        # 合并文件
-        merged_file = merge_translated_files(temp_dir)
-        
-        # 添加元数据
+        # 加载配置
         config = load_config(temp_dir)
-        add_book_metadata(merged_file, config)
+        
+        # 合并文件（包含书籍元数据）
+        merged_file = merge_translated_files(temp_dir, config=config)
         
         # 更新配置
         config['merged_file'] = merged_file
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         print(f"🎯 合并任务完成: {merged_file}")
         return 0
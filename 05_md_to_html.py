@@ -13,34 +13,23 @@
 import json
 import os
 import sys
-import shutil
 from pathlib import Path
+from typing import Optional
 import subprocess
+import tempfile
 
+from common import (
+    get_html_hash, link_tree, load_config, restore_cached_html,
+    save_config, save_html_cache
+)
 
-def load_config(temp_dir: str) -> dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
 
+# 已在运行的pandoc server地址（pandoc >= 3.0，如 http://127.0.0.1:3030）
+# 设置后转换请求发送给常驻进程，不再为每次转换启动pandoc
+PANDOC_SERVER_URL = os.environ.get('PANDOC_SERVER_URL', '')
 
-def find_template_file() -> str:
-    """查找HTML模板文件"""
-    # 在当前目录查找模板
-    current_dir = Path(__file__).parent
-    template_path = current_dir / "template.html"
-    
-    if template_path.exists():
-        return str(template_path)
-    
-    # 如果没有找到，使用默认模板
-    return create_default_template()
-
-
-def create_default_template() -> str:
-    """创建默认HTML模板"""
-    template_content = """<!DOCTYPE html>
+# 未找到template.html时使用的默认HTML模板
+DEFAULT_TEMPLATE = """<!DOCTYPE html>
 <html lang="zh">
 <head>
     <meta charset="UTF-8">
@@ -149,77 +138,9 @@ def create_default_template() -> str:
 $body$
 </body>
 </html>"""
-    
-    template_path = "default_template.html"
-    with open(template_path, 'w', encoding='utf-8') as f:
-        f.write(template_content)
-    
-    return template_path
-
 
-def copy_images_to_output(temp_dir: str, output_dir: str) -> None:
-    """复制图片文件到输出目录"""
-    images_dir = os.path.join(temp_dir, "images")
-    output_images_dir = os.path.join(output_dir, "images")
-    
-    if os.path.exists(images_dir):
-        if os.path.exists(output_images_dir):
-            shutil.rmtree(output_images_dir)
-        shutil.copytree(images_dir, output_images_dir)
-        print(f"📸 复制图片文件到: {output_images_dir}")
-
-
-def convert_md_to_html(md_file: str, template_file: str, 
-                      output_file: str = "book.html") -> str:
-    """转换markdown为HTML"""
-    
-    if not os.path.exists(md_file):
-        raise FileNotFoundError(f"Markdown文件不存在: {md_file}")
-    
-    # 确保输出目录存在
-    output_dir = os.path.dirname(output_file) if os.path.dirname(output_file) else "."
-    os.makedirs(output_dir, exist_ok=True)
-    
-    print(f"🔄 转换 Markdown 为 HTML...")
-    print(f"📄 输入: {md_file}")
-    print(f"🎨 模板: {template_file}")
-    print(f"📤 输出: {output_file}")
-    
-    try:
-        # 使用pandoc转换
-        cmd = [
-            'pandoc',
-            '-f', 'markdown',
-            '-t', 'html',
-            '--template', template_file,
-            '--standalone',
-            '--toc',  # 生成目录
-            '--toc-depth=3',
-            '--section-divs',
-            md_file,
-            '-o', output_file
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        
-        print(f"✅ HTML转换完成: {output_file}")
-        return output_file
-        
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Pandoc转换失败: {e}")
-        print(f"错误输出: {e.stderr}")
-        raise RuntimeError(f"HTML转换失败: {e}")
-
-
-def enhance_html_file(html_file: str) -> None:
-    """增强HTML文件的功能"""
-    
-    # 读取HTML内容
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    # 添加JavaScript功能
-    js_code = """
+# 插入到</body>之前的增强功能脚本
+ENHANCE_SCRIPT = """
 <script>
 // 图片点击放大功能
 document.addEventListener('DOMContentLoaded', function() {
@@ -252,15 +173,152 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 </script>
 """
+
+
+def find_template_file() -> Optional[str]:
+    """查找HTML模板文件，找不到时返回None"""
+    # 在当前目录查找模板
+    current_dir = Path(__file__).parent
+    template_path = current_dir / "template.html"
     
-    # 在</body>之前插入JavaScript
-    html_content = html_content.replace('</body>', js_code + '\n</body>')
+    if template_path.exists():
+        return str(template_path)
+    
+    return None
+
+
+def write_default_template() -> str:
+    """将默认HTML模板写入新建的临时文件，由调用方负责删除"""
+    # mkstemp以独占方式创建仅当前用户可读写的文件，不会复用他人预先放置的文件
+    fd, template_path = tempfile.mkstemp(prefix="trans-books-template-", suffix=".html")
+    with os.fdopen(fd, 'wb') as f:
+        f.write(DEFAULT_TEMPLATE.encode('utf-8'))
+    return template_path
+
+
+def copy_images_to_output(temp_dir: str, output_dir: str) -> None:
+    """复制图片文件到输出目录"""
+    images_dir = os.path.join(temp_dir, "images")
+    output_images_dir = os.path.join(output_dir, "images")
+    
+    # HTML就生成在临时目录中时，图片已经在正确的位置
+    if os.path.abspath(images_dir) == os.path.abspath(output_images_dir):
+        return
+    
+    if os.path.exists(images_dir):
+        link_tree(images_dir, output_images_dir)
+        print(f"📸 复制图片文件到: {output_images_dir}")
+
+
+def convert_with_pandoc_server(md_data: bytes, template_data: bytes) -> Optional[str]:
+    """通过pandoc server转换markdown，服务不可用时返回None"""
+    if not PANDOC_SERVER_URL:
+        return None
+    
+    from urllib import request
+    
+    # 与命令行调用使用相同的选项，template为模板内容而不是路径
+    payload = json.dumps({
+        'text': md_data.decode('utf-8'),
+        'from': 'markdown',
+        'to': 'html',
+        'template': template_data.decode('utf-8'),
+        'standalone': True,
+        'table-of-contents': True,
+        'toc-depth': 3,
+        'section-divs': True
+    }).encode('utf-8')
+    
+    req = request.Request(
+        PANDOC_SERVER_URL,
+        data=payload,
+        headers={'Content-Type': 'application/json', 'Accept': 'application/json'}
+    )
+    
+    try:
+        with request.urlopen(req, timeout=120) as response:
+            result = json.loads(response.read())
+    except (OSError, ValueError) as e:
+        print(f"⚠️  pandoc server不可用，改用pandoc命令: {e}")
+        return None
+    
+    if 'output' not in result:
+        print(f"⚠️  pandoc server转换失败，改用pandoc命令: {result.get('error', result)}")
+        return None
+    
+    return result['output']
+
+
+def convert_md_to_html(md_file: str, template_file: str, 
+                      output_file: str = "book.html") -> str:
+    """转换markdown为HTML"""
+    
+    if not os.path.exists(md_file):
+        raise FileNotFoundError(f"Markdown文件不存在: {md_file}")
+    
+    # 确保输出目录存在
+    output_dir = os.path.dirname(output_file) if os.path.dirname(output_file) else "."
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print(f"🔄 转换 Markdown 为 HTML...")
+    print(f"📄 输入: {md_file}")
+    print(f"🎨 模板: {template_file}")
+    print(f"📤 输出: {output_file}")
     
-    # 写回文件
-    with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # markdown和模板都未变化时无需再次启动pandoc
+    with open(md_file, 'rb') as f:
+        md_data = f.read()
+    with open(template_file, 'rb') as f:
+        template_data = f.read()
+    html_hash = get_html_hash(md_data, template_data, ENHANCE_SCRIPT.encode('utf-8'))
+    
+    if restore_cached_html(output_file, html_hash):
+        print(f"⏭️  跳过转换，Markdown未变化: {output_file}")
+        return output_file
+    
+    html_output = convert_with_pandoc_server(md_data, template_data)
+    
+    if html_output is None:
+        try:
+            # 使用pandoc转换，输出到stdout以便在写入文件前完成增强
+            cmd = [
+                'pandoc',
+                '-f', 'markdown',
+                '-t', 'html',
+                '--template', template_file,
+                '--standalone',
+                '--toc',  # 生成目录
+                '--toc-depth=3',
+                '--section-divs',
+                md_file
+            ]
+            
+            result = subprocess.run(cmd, capture_output=True, encoding='utf-8', check=True)
+            html_output = result.stdout
+            
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Pandoc转换失败: {e}")
+            print(f"错误输出: {e.stderr}")
+            raise RuntimeError(f"HTML转换失败: {e}")
+    
+    # 增强HTML功能后一次写入
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(enhance_html(html_output))
+    save_html_cache(output_file, html_hash)
+    
+    print(f"✅ HTML转换完成: {output_file}")
+    return output_file
+
+
+def enhance_html(html_content: str) -> str:
+    """增强HTML的功能：在</body>之前插入JavaScript"""
+    index = html_content.rfind('</body>')
+    if index == -1:
+        print("⚠️  未找到</body>，跳过HTML功能增强")
+        return html_content
     
     print("✨ HTML功能增强完成")
+    return html_content[:index] + ENHANCE_SCRIPT + '\n' + html_content[index:]
 
 
 def main():
@@ -279,28 +337,30 @@ def main():
             print("❌ 错误: 未找到合并的markdown文件，请先运行 04_merge_md.py")
             return 1
         
-        # 查找模板文件
+        # 查找模板文件，没有时使用默认模板
         template_file = find_template_file()
+        default_template_file = None
+        if template_file is None:
+            template_file = default_template_file = write_default_template()
         
         # 转换为HTML
         output_file = os.path.join(temp_dir, "book.html")
-        html_file = convert_md_to_html(
-            config['merged_file'],
-            template_file,
-            output_file
-        )
+        try:
+            html_file = convert_md_to_html(
+                config['merged_file'],
+                template_file,
+                output_file
+            )
+        finally:
+            if default_template_file is not None:
+                os.remove(default_template_file)
         
         # 复制图片文件
-        copy_images_to_output(temp_dir, temp_dir)
-        
-        # 增强HTML功能
-        enhance_html_file(html_file)
+        copy_images_to_output(temp_dir, os.path.dirname(html_file))
         
         # 更新配置
         config['html_file'] = html_file
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         print(f"🎯 HTML转换完成: {html_file}")
         return 0
@@ -8,96 +8,101 @@
 - 处理图片资源
 """
 
-import json
 import os
 import re
 import sys
-import shutil
 from pathlib import Path
 
+from common import (
+    get_html_hash, link_tree, load_config, restore_cached_html,
+    save_config, save_html_cache
+)
 
-def load_config(temp_dir: str) -> dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+try:
+    import mistune
+except ImportError:  # 可选依赖，未安装时使用内置的正则转换
+    mistune = None
+
+
+# mistune解析器只创建一次，所有调用复用
+MARKDOWN_RENDERER = (
+    mistune.create_markdown(escape=False, plugins=['strikethrough', 'table'])
+    if mistune is not None else None
+)
+
+# 逐行匹配：行首的1-4级标题保留原文，其余行去掉首尾空白
+LINE_PATTERN = re.compile(r'^(?:(#{1,4}) (.+)|[^\S\n]*(.*?)[^\S\n]*)$', re.MULTILINE)
+
+# 内联元素：粗体、斜体、内联代码，一次扫描
+# 粗体内可以嵌套斜体，斜体内可以嵌套粗体；各分支的首字符互斥，不会产生回溯
+INLINE_PATTERN = re.compile(
+    r'\*\*((?:[^*\n]|\*(?!\*))+)\*\*'
+    r'|\*((?:[^*\n]|\*\*[^*\n]+\*\*)+)\*'
+    r'|`([^`\n]+)`'
+)
+
+# 作为块级元素原样输出的行
+BLOCK_PREFIXES = ('<h', '<div', '<ul', '<ol', '<blockquote', '---')
+
+
+def render_inline(match: re.Match) -> str:
+    """转换单个内联元素"""
+    bold, italic, code = match.groups()
+    if bold is not None:
+        return f'<strong>{INLINE_PATTERN.sub(render_inline, bold)}</strong>'
+    if italic is not None:
+        return f'<em>{INLINE_PATTERN.sub(render_inline, italic)}</em>'
+    return f'<code>{code}</code>'
 
 
 def simple_markdown_to_html(markdown_content: str) -> str:
     """简单的markdown到HTML转换"""
-    html_content = markdown_content
-    
-    # 转换标题
-    html_content = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html_content, flags=re.MULTILINE)
-    html_content = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html_content, flags=re.MULTILINE)
-    html_content = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html_content, flags=re.MULTILINE)
-    html_content = re.sub(r'^#### (.+)$', r'<h4>\1</h4>', html_content, flags=re.MULTILINE)
+    if MARKDOWN_RENDERER is not None:
+        return MARKDOWN_RENDERER(markdown_content)
     
-    # 转换段落（简单版本）
-    lines = html_content.split('\n')
-    converted_lines = []
     in_paragraph = False
+    in_list = False
     
-    for line in lines:
-        line = line.strip()
+    def render_line(match: re.Match) -> str:
+        nonlocal in_paragraph, in_list
+        level, heading, line = match.groups()
+        # 本行之前需要输出的标签，直接拼接字符串，不为每行建立列表
+        prefix = ''
         
-        # 跳过空行
-        if not line:
-            if in_paragraph:
-                converted_lines.append('</p>')
-                in_paragraph = False
-            converted_lines.append('')
-            continue
+        if level is not None:
+            line = f'<h{len(level)}>{heading}</h{len(level)}>'
         
-        # 检查是否是标题或其他块级元素
-        if (line.startswith('<h') or line.startswith('<div') or 
-            line.startswith('<ul') or line.startswith('<ol') or
-            line.startswith('<blockquote') or line.startswith('---')):
+        # 空行、块级元素和列表项都会结束当前段落
+        if not line or line.startswith(BLOCK_PREFIXES) or line.startswith('- '):
             if in_paragraph:
-                converted_lines.append('</p>')
+                prefix = '</p>\n'
                 in_paragraph = False
-            converted_lines.append(line)
-            continue
+                in_list = False
+            
+            if line.startswith('- '):
+                if not in_list:
+                    prefix += '<ul>\n'
+                line = f'<li>{line[2:]}</li>'
+        else:
+            # 处理普通段落
+            if not in_paragraph:
+                prefix = '<p>\n'
+                in_paragraph = True
+            line = INLINE_PATTERN.sub(render_inline, line)
         
-        # 处理分隔符
-        if line == '---':
-            if in_paragraph:
-                converted_lines.append('</p>')
-                in_paragraph = False
-            converted_lines.append('<hr>')
-            continue
-        
-        # 处理列表项
-        if line.startswith('- '):
-            if in_paragraph:
-                converted_lines.append('</p>')
-                in_paragraph = False
-            if not converted_lines or not converted_lines[-1].startswith('<li>'):
-                converted_lines.append('<ul>')
-            converted_lines.append(f'<li>{line[2:]}</li>')
-            continue
-        
-        # 处理普通段落
-        if not in_paragraph:
-            converted_lines.append('<p>')
-            in_paragraph = True
-        
-        # 转换内联元素
-        line = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', line)  # 粗体
-        line = re.sub(r'\*(.+?)\*', r'<em>\1</em>', line)  # 斜体
-        line = re.sub(r'`(.+?)`', r'<code>\1</code>', line)  # 内联代码
-        
-        converted_lines.append(line)
+        in_list = line.startswith('<li>')
+        return prefix + line
+    
+    html_content = LINE_PATTERN.sub(render_line, markdown_content)
     
     # 关闭未关闭的段落
     if in_paragraph:
-        converted_lines.append('</p>')
-    
+        html_content += '\n</p>'
     # 关闭未关闭的列表
-    if converted_lines and converted_lines[-1].startswith('<li>'):
-        converted_lines.append('</ul>')
+    elif in_list:
+        html_content += '\n</ul>'
     
-    return '\n'.join(converted_lines)
+    return html_content
 
 
 def load_template() -> str:
@@ -162,10 +167,13 @@ def copy_images_to_output(temp_dir: str, output_dir: str) -> None:
     images_dir = os.path.join(temp_dir, "images")
     output_images_dir = os.path.join(output_dir, "images")
     
+    # HTML就生成在临时目录中时，图片已经在正确的位置
+    if os.path.abspath(images_dir) == os.path.abspath(output_images_dir):
+        print("📸 图片文件已在输出目录中，无需复制")
+        return
+    
     if os.path.exists(images_dir) and os.listdir(images_dir):
-        if os.path.exists(output_images_dir):
-            shutil.rmtree(output_images_dir)
-        shutil.copytree(images_dir, output_images_dir)
+        link_tree(images_dir, output_images_dir)
         print(f"📸 复制图片文件到: {output_images_dir}")
     else:
         print("📸 没有图片文件需要复制")
@@ -190,12 +198,20 @@ def convert_md_to_html(md_file: str, template_file: str,
     with open(md_file, 'r', encoding='utf-8') as f:
         markdown_content = f.read()
     
-    # 转换为HTML
-    html_body = simple_markdown_to_html(markdown_content)
-    
     # 加载模板
     template = load_template()
     
+    # 输入和转换方式都未变化时直接复用上次的结果
+    renderer = b'mistune' if MARKDOWN_RENDERER is not None else b'regex'
+    html_hash = get_html_hash(markdown_content.encode('utf-8'),
+                              template.encode('utf-8'), renderer)
+    if restore_cached_html(output_file, html_hash):
+        print(f"⏭️  跳过转换，Markdown未变化: {output_file}")
+        return output_file
+    
+    # 转换为HTML
+    html_body = simple_markdown_to_html(markdown_content)
+    
     # 应用模板
     html_content = template.replace('$body$', html_body)
     
@@ -207,6 +223,8 @@ def convert_md_to_html(md_file: str, template_file: str,
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(html_content)
     
+    save_html_cache(output_file, html_hash)
+    
     print(f"✅ HTML转换完成: {output_file}")
     return output_file
 
@@ -236,13 +254,11 @@ def main():
         )
         
         # 复制图片文件
-        copy_images_to_output(temp_dir, temp_dir)
+        copy_images_to_output(temp_dir, os.path.dirname(html_file))
         
         # 更新配置
         config['html_file'] = html_file
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         print(f"🎯 HTML转换完成: {html_file}")
         return 0
@@ -10,33 +10,157 @@
 - 支持目录折叠/展开
 """
 
-import json
-import os
+import importlib.util
 import re
 import sys
+from html import escape, unescape
 from pathlib import Path
-from bs4 import BeautifulSoup
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
+from common import load_config, save_config
 
-def load_config(temp_dir: str) -> dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+# BeautifulSoup只在正则快速路径无法处理时才导入；
+# lxml为可选依赖，这里只检查是否安装而不导入，未安装时使用标准库解析器
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
 
 
-def parse_html_headings(html_content: str) -> List[Dict]:
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+# 开始标签中的属性部分，引号内的 > 不作为标签结束
+HEADING_ATTRIBUTES = r'''((?:[^>"']|"[^"]*"|'[^']*')*)'''
+
+# 标题开始标签及其属性
+HEADING_OPEN_PATTERN = re.compile(r'<(h[1-6])\b' + HEADING_ATTRIBUTES + '>', re.IGNORECASE)
+
+# 只含纯文本的完整标题标签，可以不经BeautifulSoup直接解析
+SIMPLE_HEADING_PATTERN = re.compile(
+    r'<(h[1-6])\b' + HEADING_ATTRIBUTES + r'>([^<]*)(</\1\s*>)', re.IGNORECASE
+)
+
+# 注释、脚本和样式块，其中的标题标签不是真正的标题
+SKIPPED_BLOCK_PATTERN = re.compile(r'<!--.*?-->|<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+# 开始标签中的单个属性，逐个匹配以免把引号内的文字当作属性
+ATTRIBUTE_PATTERN = re.compile(r'''\s+([^\s"'>/=]+)(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'>]+))?''')
+
+# 生成ID时需要移除的字符，保留中文和英文
+CLEAN_ID_PATTERN = re.compile(r'[^\w\u4e00-\u9fff]')
+
+# 纯ASCII标题的快速路径：删除字母、数字和下划线以外的字符，与CLEAN_ID_PATTERN等价
+ASCII_ID_DELETE_TABLE = str.maketrans('', '', ''.join(
+    char for char in map(chr, range(128)) if not (char.isalnum() or char == '_')
+))
+
+# 目录中嵌套列表的开始和结束标签
+TOC_SUBLIST_OPEN = '<ul class="toc-sublist">\n'
+TOC_SUBLIST_CLOSE = '</ul>\n'
+
+# 目录项模板：层级、ID、标题文字
+TOC_ITEM_TEMPLATE = '<li class="toc-item toc-level-%d">\n<a href="#%s" class="toc-link">%s</a>\n</li>\n'
+
+# 目录、样式和脚本的插入位置
+BODY_OPEN_PATTERN = re.compile(r'<body[^>]*>', re.IGNORECASE)
+HEAD_CLOSE_PATTERN = re.compile(r'</head>', re.IGNORECASE)
+BODY_CLOSE_PATTERN = re.compile(r'</body>', re.IGNORECASE)
+
+
+def remove_id_attribute(attributes: str) -> str:
+    """删除开始标签中已有的id属性，其他属性原样保留"""
+    return ATTRIBUTE_PATTERN.sub(
+        lambda match: '' if match.group(1).lower() == 'id' else match.group(0),
+        attributes
+    )
+
+
+def parse_html_headings_fast(html_content: str) -> Optional[Tuple[List[Dict], str]]:
+    """只用正则解析标题，无法确定结果与BeautifulSoup一致时返回None"""
+    # 注释、脚本或样式中出现标题标签时交给BeautifulSoup处理
+    for block in SKIPPED_BLOCK_PATTERN.finditer(html_content):
+        if HEADING_OPEN_PATTERN.search(html_content, block.start(), block.end()):
+            return None
+    
+    headings = []
+    
+    def add_heading_id(match):
+        text = unescape(match.group(3)).strip()
+        heading_id = generate_heading_id(text, len(headings))
+        
+        headings.append({
+            'level': int(match.group(1)[1]),
+            'text': text,
+            'id': heading_id
+        })
+        
+        attributes = remove_id_attribute(match.group(2))
+        return f'<{match.group(1)}{attributes} id="{heading_id}">{match.group(3)}{match.group(4)}'
+    
+    updated_html, count = SIMPLE_HEADING_PATTERN.subn(add_heading_id, html_content)
+    
+    if count != len(HEADING_OPEN_PATTERN.findall(html_content)):
+        # 有标题内含嵌套标签或缺少结束标签
+        return None
+    
+    return headings, updated_html
+
+
+def parse_html_headings(html_content: str) -> Tuple[List[Dict], str]:
     """解析HTML中的标题标签"""
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # 标题都是纯文本时无需构建解析树
+    result = parse_html_headings_fast(html_content)
+    if result is not None:
+        return result
+    
+    from bs4 import BeautifulSoup, SoupStrainer
+    
+    # 只构建标题标签的解析树，正文内容不生成节点
+    soup = BeautifulSoup(html_content, HTML_PARSER, parse_only=SoupStrainer(HEADING_TAGS))
     headings = []
     
     # 查找所有标题标签
-    for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+    for tag in soup.find_all(HEADING_TAGS):
         level = int(tag.name[1])  # 获取标题级别
-        text = tag.get_text().strip()
+        text = (tag.string or tag.get_text()).strip()
         
         # 生成唯一的ID
+        heading_id = generate_heading_id(text, len(headings))
+        
+        headings.append({
+            'level': level,
+            'text': text,
+            'id': heading_id,
+            'element': tag
+        })
+    
+    # 在原文的标题开始标签中写入ID，不需要重新序列化整个文档
+    heading_ids = iter([heading['id'] for heading in headings])
+    
+    def add_heading_id(match):
+        heading_id = next(heading_ids, None)
+        if heading_id is None:
+            return match.group(0)
+        attributes = remove_id_attribute(match.group(2))
+        return f'<{match.group(1)}{attributes} id="{heading_id}">'
+    
+    updated_html, count = HEADING_OPEN_PATTERN.subn(add_heading_id, html_content)
+    
+    if count != len(headings):
+        # 注释或脚本中出现标题标签时无法与解析结果对应，回退到完整解析
+        return parse_html_headings_full(html_content)
+    
+    return headings, updated_html
+
+
+def parse_html_headings_full(html_content: str) -> Tuple[List[Dict], str]:
+    """完整解析HTML并为标题添加ID"""
+    from bs4 import BeautifulSoup
+    
+    soup = BeautifulSoup(html_content, HTML_PARSER)
+    headings = []
+    
+    for tag in soup.find_all(HEADING_TAGS):
+        level = int(tag.name[1])
+        text = (tag.string or tag.get_text()).strip()
+        
         heading_id = generate_heading_id(text, len(headings))
         tag['id'] = heading_id
         
@@ -53,7 +177,10 @@ def parse_html_headings(html_content: str) -> List[Dict]:
 def generate_heading_id(text: str, index: int) -> str:
     """生成标题的唯一ID"""
     # 移除特殊字符，保留中文和英文
-    clean_text = re.sub(r'[^\w\u4e00-\u9fff]', '', text)
+    if text.isascii():
+        clean_text = text.translate(ASCII_ID_DELETE_TABLE)
+    else:
+        clean_text = CLEAN_ID_PATTERN.sub('', text)
     
     # 如果文本为空，使用索引
     if not clean_text:
@@ -71,7 +198,7 @@ def generate_toc_html(headings: List[Dict]) -> str:
     if not headings:
         return ""
     
-    toc_html = """
+    parts = ["""
 <nav class="table-of-contents">
     <div class="toc-header">
         <h2>📚 目录</h2>
@@ -79,48 +206,43 @@ def generate_toc_html(headings: List[Dict]) -> str:
     </div>
     <div class="toc-content">
         <ul class="toc-list">
-"""
+"""]
     
     current_level = 1
     
     for heading in headings:
         level = heading['level']
+        # 标题文字是解析后的纯文本，需要转义后才能放回HTML
         text = heading['text']
         heading_id = heading['id']
         
         # 处理层级变化
         if level > current_level:
             # 需要开始新的嵌套列表
-            for _ in range(level - current_level):
-                toc_html += '<ul class="toc-sublist">\n'
+            parts.append(TOC_SUBLIST_OPEN * (level - current_level))
         elif level < current_level:
             # 需要关闭嵌套列表
-            for _ in range(current_level - level):
-                toc_html += '</ul>\n'
+            parts.append(TOC_SUBLIST_CLOSE * (current_level - level))
         
         # 添加目录项
-        toc_html += f'<li class="toc-item toc-level-{level}">\n'
-        toc_html += f'<a href="#{heading_id}" class="toc-link">{text}</a>\n'
-        toc_html += '</li>\n'
+        parts.append(TOC_ITEM_TEMPLATE % (level, escape(heading_id), escape(text)))
         
         current_level = level
     
     # 关闭所有未关闭的列表
-    for _ in range(current_level - 1):
-        toc_html += '</ul>\n'
+    parts.append(TOC_SUBLIST_CLOSE * (current_level - 1))
     
-    toc_html += """
+    parts.append("""
         </ul>
     </div>
 </nav>
-"""
+""")
     
-    return toc_html
+    return ''.join(parts)
 
 
-def generate_toc_css() -> str:
-    """生成目录CSS样式"""
-    return """
+# 目录CSS样式
+TOC_CSS = """
 <style>
 .table-of-contents {
     background-color: #f8f9fa;
@@ -282,9 +404,8 @@ def generate_toc_css() -> str:
 """
 
 
-def generate_toc_js() -> str:
-    """生成目录JavaScript功能"""
-    return """
+# 目录JavaScript功能
+TOC_JS = """
 <script>
 function toggleToc() {
     const content = document.querySelector('.toc-content');
@@ -376,6 +497,16 @@ document.addEventListener('DOMContentLoaded', function() {
 """
 
 
+def generate_toc_css() -> str:
+    """生成目录CSS样式"""
+    return TOC_CSS
+
+
+def generate_toc_js() -> str:
+    """生成目录JavaScript功能"""
+    return TOC_JS
+
+
 def add_table_of_contents(html_file: str, output_file: str = None) -> str:
     """为HTML文件添加目录"""
     if output_file is None:
@@ -384,8 +515,9 @@ def add_table_of_contents(html_file: str, output_file: str = None) -> str:
     print(f"📑 为HTML文件添加目录: {html_file}")
     
     # 读取HTML文件
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    # 以二进制读取后一次解码，跳过文本模式的换行转换
+    with open(html_file, 'rb') as f:
+        html_content = f.read().decode('utf-8')
     
     # 解析标题
     headings, updated_html = parse_html_headings(html_content)
@@ -399,41 +531,36 @@ def add_table_of_contents(html_file: str, output_file: str = None) -> str:
     # 生成目录HTML
     toc_html = generate_toc_html(headings)
     
-    # 生成CSS和JavaScript
-    toc_css = generate_toc_css()
-    toc_js = generate_toc_js()
-    
     # 在HTML中插入目录
+    # 先找出所有插入位置，写文件时按位置依次拼接
+    insertions = []
+    
     # 在<body>标签后插入目录
-    body_pattern = r'(<body[^>]*>)'
-    if re.search(body_pattern, updated_html):
-        updated_html = re.sub(
-            body_pattern,
-            r'\1' + toc_html,
-            updated_html
-        )
+    body_open = BODY_OPEN_PATTERN.search(updated_html)
+    if body_open:
+        insertions.append((body_open.end(), toc_html))
     
     # 在<head>中插入CSS
-    head_pattern = r'(</head>)'
-    if re.search(head_pattern, updated_html):
-        updated_html = re.sub(
-            head_pattern,
-            toc_css + r'\1',
-            updated_html
-        )
+    head_close = HEAD_CLOSE_PATTERN.search(updated_html)
+    if head_close:
+        insertions.append((head_close.start(), TOC_CSS))
     
     # 在</body>前插入JavaScript
-    body_end_pattern = r'(</body>)'
-    if re.search(body_end_pattern, updated_html):
-        updated_html = re.sub(
-            body_end_pattern,
-            toc_js + r'\1',
-            updated_html
-        )
+    body_close = BODY_CLOSE_PATTERN.search(updated_html)
+    if body_close:
+        insertions.append((body_close.start(), TOC_JS))
+    
+    insertions.sort(key=lambda insertion: insertion[0])
     
     # 写入文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(updated_html)
+    # 按插入位置分段写出，不再在内存中拼出完整的新文档
+    with open(output_file, 'wb') as f:
+        last_position = 0
+        for position, content in insertions:
+            f.write(updated_html[last_position:position].encode('utf-8'))
+            f.write(content.encode('utf-8'))
+            last_position = position
+        f.write(updated_html[last_position:].encode('utf-8'))
     
     print(f"✅ 目录添加完成: {output_file}")
     return output_file
@@ -460,9 +587,7 @@ def main():
         
         # 更新配置
         config['final_html'] = final_html
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         print(f"🎯 目录生成完成: {final_html}")
         return 0
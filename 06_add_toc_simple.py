@@ -8,43 +8,48 @@
 - 添加到HTML最前面
 """
 
-import json
-import os
 import re
 import sys
 
+from common import load_config, save_config
 
-def load_config(temp_dir: str) -> dict:
-    """加载配置文件"""
-    config_path = os.path.join(temp_dir, "config.json")
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
 
+# 标题标签及其内容，属性引号内的 > 不作为标签结束
+HEADING_PATTERN = re.compile(
+    r'''<(h[1-6])\b(?:[^>"']|"[^"]*"|'[^']*')*>(.*?)</\1>''', re.IGNORECASE | re.DOTALL
+)
 
-def parse_headings_simple(html_content: str) -> list:
-    """简单解析HTML中的标题"""
+# 目录的插入位置
+BODY_OPEN_PATTERN = re.compile(r'<body[^>]*>', re.IGNORECASE)
+
+# 目录项模板：缩进、ID、标题文字
+TOC_ITEM_TEMPLATE = '%s<li><a href="#%s">%s</a></li>\n'
+
+
+def parse_headings_simple(html_content: str) -> tuple:
+    """简单解析HTML中的标题，并为标题添加ID"""
     headings = []
     
-    # 查找所有标题标签
-    heading_pattern = r'<(h[1-6]).*?>(.*?)</\1>'
-    matches = re.finditer(heading_pattern, html_content, re.IGNORECASE | re.DOTALL)
-    
-    for i, match in enumerate(matches):
-        tag = match.group(1).lower()
-        text = match.group(2).strip()
+    def add_heading_id(match):
+        tag = match.group(1)
         level = int(tag[1])
         
         # 生成ID
-        heading_id = f"heading-{i+1}"
+        heading_id = f"heading-{len(headings)+1}"
         
         headings.append({
             'level': level,
-            'text': text,
-            'id': heading_id,
-            'original': match.group(0)
+            'text': match.group(2).strip(),
+            'id': heading_id
         })
+        
+        # 在标签名之后插入ID
+        return f'<{tag} id="{heading_id}"' + match.group(0)[len(tag) + 1:]
     
-    return headings
+    # 查找所有标题标签，一次扫描完成ID插入
+    updated_html = HEADING_PATTERN.sub(add_heading_id, html_content)
+    
+    return headings, updated_html
 
 
 def generate_simple_toc_html(headings: list) -> str:
@@ -52,17 +57,17 @@ def generate_simple_toc_html(headings: list) -> str:
     if not headings:
         return ""
     
-    toc_html = """
+    parts = ["""
 <div class="table-of-contents">
     <h2>📚 目录</h2>
     <ul class="toc-list">
-"""
+"""]
     
     for heading in headings:
         indent = "  " * (heading['level'] - 1)
-        toc_html += f'{indent}<li><a href="#{heading["id"]}">{heading["text"]}</a></li>\n'
+        parts.append(TOC_ITEM_TEMPLATE % (indent, heading['id'], heading['text']))
     
-    toc_html += """
+    parts.append("""
     </ul>
 </div>
 
@@ -129,9 +134,9 @@ def generate_simple_toc_html(headings: list) -> str:
 }
 </style>
 
-"""
+""")
     
-    return toc_html
+    return ''.join(parts)
 
 
 def add_simple_toc(html_file: str, output_file: str = None) -> str:
@@ -142,11 +147,12 @@ def add_simple_toc(html_file: str, output_file: str = None) -> str:
     print(f"📑 为HTML文件添加目录: {html_file}")
     
     # 读取HTML文件
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    # 以二进制读取后一次解码，跳过文本模式的换行转换
+    with open(html_file, 'rb') as f:
+        html_content = f.read().decode('utf-8')
     
     # 解析标题
-    headings = parse_headings_simple(html_content)
+    headings, updated_html = parse_headings_simple(html_content)
     
     if not headings:
         print("⚠️  未找到任何标题，跳过目录生成")
@@ -154,37 +160,20 @@ def add_simple_toc(html_file: str, output_file: str = None) -> str:
     
     print(f"📋 找到 {len(headings)} 个标题")
     
-    # 为标题添加ID
-    updated_html = html_content
-    for heading in headings:
-        # 在原始标题标签中添加ID
-        original_tag = heading['original']
-        tag_name = re.match(r'<(h[1-6])', original_tag, re.IGNORECASE).group(1)
-        new_tag = original_tag.replace(
-            f'<{tag_name}',
-            f'<{tag_name} id="{heading["id"]}"',
-            1
-        )
-        updated_html = updated_html.replace(original_tag, new_tag)
-    
     # 生成目录HTML
     toc_html = generate_simple_toc_html(headings)
     
     # 在<body>标签后插入目录
-    body_pattern = r'(<body[^>]*>)'
-    if re.search(body_pattern, updated_html):
-        updated_html = re.sub(
-            body_pattern,
-            r'\1' + toc_html,
-            updated_html
-        )
-    else:
-        # 如果没有找到body标签，在开头插入
-        updated_html = toc_html + updated_html
+    body_open = BODY_OPEN_PATTERN.search(updated_html)
+    # 如果没有找到body标签，在开头插入
+    position = body_open.end() if body_open else 0
     
     # 写入文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(updated_html)
+    # 按插入位置分段写出，不再在内存中拼出完整的新文档
+    with open(output_file, 'wb') as f:
+        f.write(updated_html[:position].encode('utf-8'))
+        f.write(toc_html.encode('utf-8'))
+        f.write(updated_html[position:].encode('utf-8'))
     
     print(f"✅ 目录添加完成: {output_file}")
     return output_file
@@ -211,9 +200,7 @@ def main():
         
         # 更新配置
         config['final_html'] = final_html
-        config_path = os.path.join(temp_dir, "config.json")
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        save_config(config, temp_dir)
         
         print(f"🎯 目录生成完成: {final_html}")
         return 0
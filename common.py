@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+common.py - 各步骤脚本共用的工具函数
+
+功能：
+- 读写临时目录中的config.json，在各步骤之间传递状态
+- 发布图片目录、缓存HTML转换结果
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时使用标准库json
+    orjson = None
+
+
+def load_config(temp_dir: str) -> dict:
+    """加载配置文件"""
+    config_path = os.path.join(temp_dir, "config.json")
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"配置文件不存在: {config_path}")
+    
+    with open(config_path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def save_config(config: dict, temp_dir: str) -> str:
+    """保存配置文件"""
+    config_path = os.path.join(temp_dir, "config.json")
+    if orjson is not None:
+        data = orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(config, indent=2, ensure_ascii=False).encode('utf-8')
+    
+    # 内容未变化时不重写；否则先写临时文件再替换，避免中断时留下不完整的配置
+    try:
+        with open(config_path, 'rb') as f:
+            if f.read() == data:
+                return config_path
+    except FileNotFoundError:
+        pass
+    
+    tmp_path = f"{config_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, config_path)
+    return config_path
+
+
+def link_tree(src: str, dst: str) -> None:
+    """以硬链接方式发布目录，无法链接时回退为复制"""
+    src_stat = os.stat(src)
+    os.makedirs(dst, exist_ok=True)
+    
+    # 目录的mtime在增删文件时才会改变，一致说明本目录的文件上次发布后没有变化；
+    # 子目录的变化不会反映到这里，因此仍要逐个递归比较
+    unchanged = os.stat(dst).st_mtime_ns == src_stat.st_mtime_ns
+    
+    names = set()
+    with os.scandir(src) as entries:
+        for entry in entries:
+            names.add(entry.name)
+            target = os.path.join(dst, entry.name)
+            
+            if entry.is_dir():
+                link_tree(entry.path, target)
+                continue
+            
+            if unchanged:
+                continue
+            
+            if os.path.lexists(target):
+                if os.path.samefile(entry.path, target):
+                    continue
+                os.remove(target)
+            
+            try:
+                os.link(entry.path, target)
+            except OSError:
+                # 跨文件系统等无法硬链接的情况
+                shutil.copyfile(entry.path, target)
+    
+    # 删除源目录中已不存在的文件
+    if not unchanged:
+        with os.scandir(dst) as entries:
+            stale = [entry for entry in entries if entry.name not in names]
+        for entry in stale:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+    
+    os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+
+
+def get_html_hash(*parts: bytes) -> str:
+    """根据转换输入生成内容哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def restore_cached_html(output_file: str, html_hash: str) -> bool:
+    """输入未变化时从缓存恢复HTML，返回是否命中"""
+    # 后续步骤会原地修改HTML（如添加目录），因此缓存单独保存一份转换结果
+    try:
+        with open(f"{output_file}.hash", 'r', encoding='utf-8') as f:
+            if f.read().strip() != html_hash:
+                return False
+        shutil.copyfile(f"{output_file}.cache", output_file)
+    except OSError:
+        return False
+    
+    return True
+
+
+def save_html_cache(output_file: str, html_hash: str) -> None:
+    """保存转换结果及其输入哈希，供下次运行复用"""
+    hash_file = f"{output_file}.hash"
+    # 先删除旧哈希，避免中断时旧哈希对应新缓存
+    if os.path.exists(hash_file):
+        os.remove(hash_file)
+    shutil.copyfile(output_file, f"{output_file}.cache")
+    with open(hash_file, 'w', encoding='utf-8') as f:
+        f.write(html_hash)
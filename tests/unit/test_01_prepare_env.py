@@ -11,7 +11,7 @@ from pathlib import Path
 from unittest.mock import patch, MagicMock
 
 # 添加项目根目录到路径
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 try:
     from prepare_env import (
@@ -23,7 +23,7 @@ except ImportError:
     import importlib.util
     spec = importlib.util.spec_from_file_location(
         "prepare_env", 
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), "01_prepare_env.py")
+        os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "01_prepare_env.py")
     )
     prepare_env = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(prepare_env)
@@ -122,11 +122,11 @@ class TestPrepareEnv(unittest.TestCase):
         self.assertEqual(loaded_config['input_file'], "test.pdf")
         self.assertEqual(loaded_config['output_lang'], "zh")
     
-    @patch('subprocess.run')
-    def test_check_dependencies(self, mock_run):
+    @patch('shutil.which')
+    def test_check_dependencies(self, mock_which):
         """测试依赖检查"""
         # 模拟成功的依赖检查
-        mock_run.return_value.returncode = 0
+        mock_which.return_value = '/usr/bin/tool'
         
         deps = check_dependencies()
         
@@ -134,8 +134,18 @@ class TestPrepareEnv(unittest.TestCase):
         self.assertIn('claude', deps)
         self.assertIn('pandoc', deps)
         self.assertIn('python', deps)
+        self.assertTrue(deps['claude'])
+        self.assertTrue(deps['pandoc'])
         self.assertTrue(deps['python'])  # Python应该总是可用的
     
+    @patch('shutil.which', return_value=None)
+    def test_check_dependencies_missing(self, mock_which):
+        """测试缺少依赖"""
+        deps = check_dependencies()
+        
+        self.assertFalse(deps['claude'])
+        self.assertFalse(deps['pandoc'])
+    
     def test_prepare_environment_success(self):
         """测试完整环境准备流程"""
         config = prepare_environment(
@@ -171,28 +181,43 @@ class TestPrepareEnv(unittest.TestCase):
                 output_lang="zh"
             )
     
-    @patch('sys.argv', ['01_prepare_env.py', 'test.pdf'])
     def test_parse_arguments_basic(self):
         """测试基本参数解析"""
-        args = parse_arguments()
-        self.assertEqual(args.input_file, 'test.pdf')
+        with patch('sys.argv', ['01_prepare_env.py', self.test_pdf]):
+            args = parse_arguments()
+        self.assertEqual(args.input_file, self.test_pdf)
         self.assertEqual(args.input_lang, 'auto')
         self.assertEqual(args.olang, 'zh')
         self.assertEqual(args.prompt, '')
+        self.assertEqual(args.concurrency, 8)
     
-    @patch('sys.argv', [
-        '01_prepare_env.py', 'test.pdf', 
-        '-l', 'en', '--olang', 'ja', 
-        '-p', 'custom prompt', '--temp-dir', 'custom_temp'
-    ])
     def test_parse_arguments_full(self):
         """测试完整参数解析"""
-        args = parse_arguments()
-        self.assertEqual(args.input_file, 'test.pdf')
+        with patch('sys.argv', [
+            '01_prepare_env.py', self.test_pdf, 
+            '-l', 'en', '--olang', 'ja', 
+            '-p', 'custom prompt', '--temp-dir', 'custom_temp',
+            '--concurrency', '4'
+        ]):
+            args = parse_arguments()
+        self.assertEqual(args.input_file, self.test_pdf)
         self.assertEqual(args.input_lang, 'en')
         self.assertEqual(args.olang, 'ja')
         self.assertEqual(args.prompt, 'custom prompt')
         self.assertEqual(args.temp_dir, 'custom_temp')
+        self.assertEqual(args.concurrency, 4)
+    
+    def test_parse_arguments_nonexistent_file(self):
+        """测试参数解析时拒绝不存在的文件"""
+        with patch('sys.argv', ['01_prepare_env.py', 'nonexistent.pdf']):
+            with self.assertRaises(SystemExit):
+                parse_arguments()
+    
+    def test_parse_arguments_invalid_format(self):
+        """测试参数解析时拒绝不支持的格式"""
+        with patch('sys.argv', ['01_prepare_env.py', self.test_invalid]):
+            with self.assertRaises(SystemExit):
+                parse_arguments()
 
 
 class TestPrepareEnvIntegration(unittest.TestCase):
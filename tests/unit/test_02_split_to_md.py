@@ -0,0 +1,163 @@
+"""
+单元测试 - 02_split_to_md.py
+"""
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+import unittest
+import importlib.util
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_DIR)
+
+spec = importlib.util.spec_from_file_location(
+    "split_to_md",
+    os.path.join(PROJECT_DIR, "02_split_to_md.py")
+)
+split_to_md = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(split_to_md)
+
+split_markdown_pages = split_to_md.split_markdown_pages
+flatten_images = split_to_md.flatten_images
+rewrite_image_references = split_to_md.rewrite_image_references
+
+
+class TestSplitMarkdownPages(unittest.TestCase):
+    """测试Markdown按章节拆分"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.markdown_file = os.path.join(self.temp_dir, "full.md")
+    
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+    
+    def write(self, content):
+        with open(self.markdown_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return self.markdown_file
+    
+    def split(self, content):
+        pages = []
+        for md_file in split_markdown_pages(self.write(content), self.temp_dir):
+            with open(md_file, 'r', encoding='utf-8') as f:
+                pages.append(f.read())
+        return pages
+    
+    def test_split_on_h1(self):
+        """测试按一级标题拆分，二级标题不拆分"""
+        pages = self.split("# 第一章\n正文一\n## 小节\n正文二\n# 第二章\n正文三\n")
+        
+        self.assertEqual(pages, [
+            "# 第一章\n正文一\n## 小节\n正文二\n",
+            "# 第二章\n正文三\n",
+        ])
+    
+    def test_heading_inside_fence_not_split(self):
+        """测试代码块中的 # 行不作为拆分点"""
+        pages = self.split("# 第一章\n```bash\n# 注释\necho hi\n```\n# 第二章\n正文\n")
+        
+        self.assertEqual(len(pages), 2)
+        self.assertIn("# 注释\necho hi\n```", pages[0])
+    
+    def test_long_chapter_split_on_blank_line(self):
+        """测试超过MAX_PAGE_CHARS的章节在空行处继续拆分"""
+        content = "# 第一章\n" + "".join(f"第{i}段内容\n\n" for i in range(6))
+        
+        with patch.object(split_to_md, 'MAX_PAGE_CHARS', 20):
+            pages = self.split(content)
+        
+        self.assertGreater(len(pages), 1)
+        self.assertEqual("".join(pages).replace("\n", ""), content.replace("\n", ""))
+        for page in pages:
+            self.assertNotIn("\n\n\n", page)
+    
+    def test_long_fence_not_split(self):
+        """测试超长代码块内的空行不作为拆分点"""
+        code = "".join(f"line{i}\n\n" for i in range(10))
+        
+        with patch.object(split_to_md, 'MAX_PAGE_CHARS', 20):
+            pages = self.split(f"# 第一章\n```\n{code}```\n")
+        
+        self.assertEqual(len(pages), 1)
+    
+    def test_empty_pages_skipped(self):
+        """测试空白页面不生成文件，页码连续"""
+        files = split_markdown_pages(self.write("\n\n# 第一章\n正文\n"), self.temp_dir)
+        
+        self.assertEqual([os.path.basename(f) for f in files], ["page0001.md"])
+
+
+class TestFlattenImages(unittest.TestCase):
+    """测试pandoc提取的图片目录展平"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.images_dir = os.path.join(self.temp_dir, "images")
+        for sub_dir, content in [("media", "1"), (os.path.join("OEBPS", "img"), "2")]:
+            os.makedirs(os.path.join(self.images_dir, sub_dir))
+            with open(os.path.join(self.images_dir, sub_dir, "a.png"), 'w') as f:
+                f.write(content)
+    
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+    
+    def flatten(self, references):
+        """写入引用这些图片的full.md，展平后返回新的Markdown内容"""
+        markdown_file = os.path.join(self.temp_dir, "full.md")
+        with open(markdown_file, 'w', encoding='utf-8') as f:
+            for reference in references:
+                f.write(f"![图]({reference}){{width=50%}}\n")
+        
+        rewrite_image_references(markdown_file, flatten_images(self.images_dir))
+        
+        with open(markdown_file, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def test_collision_renamed_and_referenced(self):
+        """测试同名图片被重命名，引用改为新路径，空目录被删除"""
+        references = {
+            os.path.join(self.images_dir, "media", "a.png"): "1",
+            os.path.join(self.images_dir, "OEBPS", "img", "a.png"): "2",
+        }
+        content = self.flatten(references)
+        
+        # 子目录已删除，两张图片都保留在images目录下
+        names = os.listdir(self.images_dir)
+        self.assertEqual(len(names), 2)
+        self.assertIn("a.png", names)
+        
+        # 每个引用都指向images/下原来的那张图片
+        new_references = re.findall(r'\]\(([^)]+)\)', content)
+        self.assertEqual(len(new_references), 2)
+        for new_reference, expected in zip(new_references, references.values()):
+            self.assertTrue(new_reference.startswith("images/"))
+            with open(os.path.join(self.temp_dir, new_reference), 'r') as f:
+                self.assertEqual(f.read(), expected)
+    
+    def test_absolute_temp_dir_references_relative(self):
+        """测试临时目录为绝对路径时，所有引用都改为images/文件名"""
+        self.assertTrue(os.path.isabs(self.images_dir))
+        with open(os.path.join(self.images_dir, "media", "b.png"), 'w') as f:
+            f.write("3")
+        
+        content = self.flatten([
+            os.path.join(self.images_dir, "media", "b.png"),
+            os.path.join(self.images_dir, "media", "a.png"),
+        ])
+        
+        self.assertNotIn(self.temp_dir, content)
+        self.assertIn("![图](images/b.png){width=50%}", content)
+        self.assertRegex(content, r'!\[图\]\(images/[^/)]*a\.png\)')
+
+if __name__ == '__main__':
+    unittest.main()
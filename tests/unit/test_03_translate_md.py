@@ -0,0 +1,194 @@
+"""
+单元测试 - 03_translate_md.py
+"""
+
+import os
+import sys
+import json
+import queue
+import unittest
+import importlib.util
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_DIR)
+
+spec = importlib.util.spec_from_file_location(
+    "translate_md",
+    os.path.join(PROJECT_DIR, "03_translate_md.py")
+)
+translate_md = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(translate_md)
+
+ClaudeSession = translate_md.ClaudeSession
+PAGE_MARKER = translate_md.PAGE_MARKER
+construct_batch_content = translate_md.construct_batch_content
+split_batch_output = translate_md.split_batch_output
+
+
+def make_output(*pages, preamble=""):
+    """按页面标记拼接模拟的Claude批量输出"""
+    parts = [preamble] if preamble else []
+    for index, page in enumerate(pages, 1):
+        parts.append(f"{PAGE_MARKER.format(index)}\n{page}")
+    return '\n\n'.join(parts)
+
+
+class TestBatchPages(unittest.TestCase):
+    """测试多页批量翻译的页面标记协议"""
+    
+    def test_construct_batch_content_markers(self):
+        """测试每页前都有对应的标记行"""
+        content = construct_batch_content(["第一页", "第二页\n", "第三页"])
+        
+        for index in range(1, 4):
+            self.assertIn(f"\n{PAGE_MARKER.format(index)}\n", content)
+        self.assertNotIn(PAGE_MARKER.format(4), content)
+    
+    def test_split_round_trip(self):
+        """测试标记完整时按页拆分"""
+        pages = split_batch_output(make_output("译文一", "译文二", "译文三"), 3)
+        
+        self.assertEqual(pages, ["译文一", "译文二", "译文三"])
+    
+    def test_split_drops_preamble(self):
+        """测试第一个标记之前的说明文字被丢弃"""
+        output = make_output("译文一", "译文二", preamble="以下是翻译结果：")
+        
+        self.assertEqual(split_batch_output(output, 2), ["译文一", "译文二"])
+    
+    def test_split_marker_trailing_whitespace(self):
+        """测试标记行末尾的空白不影响拆分"""
+        output = f"{PAGE_MARKER.format(1)}  \n译文一\n{PAGE_MARKER.format(2)}\t\n译文二"
+        
+        self.assertEqual(split_batch_output(output, 2), ["译文一", "译文二"])
+    
+    def test_split_missing_marker(self):
+        """测试缺少标记时返回None，交给逐页翻译"""
+        output = f"{PAGE_MARKER.format(1)}\n译文一\n译文二\n{PAGE_MARKER.format(3)}\n译文三"
+        
+        self.assertIsNone(split_batch_output(output, 3))
+    
+    def test_split_missing_last_page(self):
+        """测试最后一页缺失时返回None"""
+        self.assertIsNone(split_batch_output(make_output("译文一", "译文二"), 3))
+    
+    def test_split_duplicate_marker(self):
+        """测试重复的标记返回None"""
+        output = make_output("译文一", "译文二") + f"\n{PAGE_MARKER.format(2)}\n再次译文二"
+        
+        self.assertIsNone(split_batch_output(output, 2))
+    
+    def test_split_extra_marker(self):
+        """测试多出的页面标记返回None"""
+        self.assertIsNone(split_batch_output(make_output("译文一", "译文二", "多余"), 2))
+    
+    def test_split_out_of_order(self):
+        """测试标记顺序错乱时返回None"""
+        output = f"{PAGE_MARKER.format(2)}\n译文二\n{PAGE_MARKER.format(1)}\n译文一"
+        
+        self.assertIsNone(split_batch_output(output, 2))
+    
+    def test_split_inline_marker_text_kept(self):
+        """测试正文中不单独成行的标记文字保留在页面内"""
+        page = f"原文提到 {PAGE_MARKER.format(2)} 这样的文字"
+        
+        self.assertEqual(split_batch_output(make_output(page, "译文二"), 2), [page, "译文二"])
+    
+    def test_split_marker_line_in_content(self):
+        """测试页面内容中出现标记行时无法对齐，返回None而不是错位"""
+        page = f"译文一\n{PAGE_MARKER.format(2)}\n仍属于第一页"
+        
+        self.assertIsNone(split_batch_output(make_output(page, "译文二"), 2))
+    
+    
+    def test_split_empty_section(self):
+        """测试标记完整但某页译文为空时返回None，交给逐页翻译"""
+        self.assertIsNone(split_batch_output(make_output("译文一", "", "译文三"), 3))
+        self.assertIsNone(split_batch_output(make_output("译文一", "```\n```"), 2))
+
+
+class FakeStdin:
+    """记录写入的请求，每收到一行就让对应的进程输出回复"""
+    
+    def __init__(self, process):
+        self.process = process
+    
+    def write(self, data):
+        self.process.respond(json.loads(data))
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.process.stdout.put(None)
+
+
+class FakeStdout:
+    """按行输出脚本化的stream-json，放入None表示EOF"""
+    
+    def __init__(self):
+        self.lines = queue.Queue()
+    
+    def put(self, line):
+        self.lines.put(line)
+    
+    def __iter__(self):
+        return iter(self.lines.get, None)
+
+
+class FakeClaudeProcess:
+    """模拟claude进程：alive为False时进程已退出，不输出任何内容"""
+    
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.stdin = FakeStdin(self)
+        self.stdout = FakeStdout()
+        if not alive:
+            self.stdout.put(None)
+    
+    def respond(self, message):
+        if not self.alive:
+            return
+        text = message['message']['content'][0]['text']
+        self.stdout.put(json.dumps({"type": "system", "subtype": "init"}) + '\n')
+        self.stdout.put(json.dumps({"type": "result", "is_error": False, "result": f"译文:{text}"}) + '\n')
+    
+    def poll(self):
+        return None
+    
+    def wait(self, timeout=None):
+        return 0
+    
+    def kill(self):
+        pass
+
+
+class TestClaudeSession(unittest.TestCase):
+    """测试常驻Claude进程的重启和退出处理"""
+    
+    def test_restart_when_char_budget_exceeded(self):
+        """测试累计字符数超过上限时启动新进程"""
+        with patch.object(translate_md.subprocess, 'Popen',
+                          side_effect=lambda *args, **kwargs: FakeClaudeProcess()) as popen:
+            with ClaudeSession(max_chars=20) as session:
+                self.assertEqual(session.translate("第一页", timeout=5), "译文:第一页")
+                self.assertEqual(session.translate("第二页", timeout=5), "译文:第二页")
+                self.assertEqual(popen.call_count, 1)
+                
+                self.assertEqual(session.translate("第三页", timeout=5), "译文:第三页")
+                self.assertEqual(popen.call_count, 2)
+                self.assertEqual(session.request_count, 1)
+    
+    def test_dead_process_raises(self):
+        """测试进程意外退出时抛出错误而不是等到超时"""
+        with patch.object(translate_md.subprocess, 'Popen',
+                          return_value=FakeClaudeProcess(alive=False)):
+            with ClaudeSession() as session:
+                with self.assertRaises(RuntimeError):
+                    session.translate("第一页", timeout=5)
+                self.assertIsNone(session.process)
+
+if __name__ == '__main__':
+    unittest.main()
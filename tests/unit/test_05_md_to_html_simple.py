@@ -0,0 +1,66 @@
+"""
+单元测试 - 05_md_to_html_simple.py
+"""
+
+import os
+import sys
+import unittest
+import importlib.util
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_DIR)
+
+spec = importlib.util.spec_from_file_location(
+    "md_to_html_simple",
+    os.path.join(PROJECT_DIR, "05_md_to_html_simple.py")
+)
+md_to_html_simple = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(md_to_html_simple)
+
+
+def convert(markdown_content):
+    """使用内置的正则转换，不受是否安装mistune影响"""
+    with patch.object(md_to_html_simple, 'MARKDOWN_RENDERER', None):
+        return md_to_html_simple.simple_markdown_to_html(markdown_content)
+
+
+class TestSimpleMarkdown(unittest.TestCase):
+    """测试内置的正则markdown转换"""
+    
+    def test_inline_elements(self):
+        """测试粗体、斜体和内联代码"""
+        html = convert("**粗体** 与 *斜体* 与 `代码`")
+        
+        self.assertIn("<strong>粗体</strong> 与 <em>斜体</em> 与 <code>代码</code>", html)
+    
+    def test_italic_inside_bold(self):
+        """测试粗体中嵌套斜体"""
+        html = convert("**bold *with* italic**")
+        
+        self.assertIn("<strong>bold <em>with</em> italic</strong>", html)
+    
+    def test_bold_inside_italic(self):
+        """测试斜体中嵌套粗体"""
+        html = convert("*italic **with** bold*")
+        
+        self.assertIn("<em>italic <strong>with</strong> bold</em>", html)
+    
+    def test_code_keeps_asterisks(self):
+        """测试内联代码中的星号不作为强调标记"""
+        html = convert("`a*b*c`")
+        
+        self.assertIn("<code>a*b*c</code>", html)
+    
+    def test_headings_and_list(self):
+        """测试标题和列表"""
+        html = convert("# 标题\n\n- 第一项\n- 第二项\n\n正文")
+        
+        self.assertIn("<h1>标题</h1>", html)
+        self.assertIn("<ul>\n<li>第一项</li>\n<li>第二项</li>", html)
+        self.assertIn("<p>\n正文\n</p>", html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+单元测试 - 06_add_toc.py
+"""
+
+import os
+import sys
+import unittest
+import importlib.util
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_DIR)
+
+spec = importlib.util.spec_from_file_location(
+    "add_toc",
+    os.path.join(PROJECT_DIR, "06_add_toc.py")
+)
+add_toc = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(add_toc)
+
+parse_html_headings = add_toc.parse_html_headings
+parse_html_headings_fast = add_toc.parse_html_headings_fast
+
+
+def parse_with_soup(html_content):
+    """跳过正则快速路径，只用BeautifulSoup解析"""
+    with patch.object(add_toc, 'parse_html_headings_fast', return_value=None):
+        return parse_html_headings(html_content)
+
+
+def heading_fields(headings):
+    """只比较标题的级别、文字和ID"""
+    return [(h['level'], h['text'], h['id']) for h in headings]
+
+
+def make_html(body):
+    """构造包含注释、样式和脚本的完整HTML"""
+    return (
+        "<html><head><style>h1 { color: red; }</style></head><body>\n"
+        "<!-- 页面内容 -->\n"
+        f"{body}\n"
+        "<script>var s = 'x';</script>\n"
+        "</body></html>"
+    )
+
+
+class TestParseHeadingsFast(unittest.TestCase):
+    """测试标题解析的正则快速路径与BeautifulSoup结果一致"""
+    
+    def assert_same_as_soup(self, html_content):
+        fast = parse_html_headings_fast(html_content)
+        self.assertIsNotNone(fast)
+        
+        headings, updated_html = parse_with_soup(html_content)
+        self.assertEqual(heading_fields(fast[0]), heading_fields(headings))
+        self.assertEqual(fast[1], updated_html)
+        return fast
+    
+    def test_plain_headings(self):
+        """测试纯文本标题"""
+        headings, updated_html = self.assert_same_as_soup(make_html(
+            "<h1>第一章 引言</h1>\n<p>正文</p>\n<h2>1.1 Background</h2>\n<H3>  细节  </H3>"
+        ))
+        
+        self.assertEqual(heading_fields(headings), [
+            (1, '第一章 引言', 'heading-0-第一章引言'),
+            (2, '1.1 Background', 'heading-1-11Background'),
+            (3, '细节', 'heading-2-细节'),
+        ])
+        self.assertIn('<h1 id="heading-0-第一章引言">第一章 引言</h1>', updated_html)
+    
+    def test_existing_id_replaced(self):
+        """测试已有的id属性被替换，其他属性保留"""
+        _, updated_html = self.assert_same_as_soup(make_html(
+            '<h1 class="title" id="old">Title</h1>'
+        ))
+        
+        self.assertIn('<h1 class="title" id="heading-0-Title">Title</h1>', updated_html)
+    
+    def test_entities(self):
+        """测试标题中的字符实体与get_text()结果一致"""
+        headings, _ = self.assert_same_as_soup(make_html(
+            "<h1>A &amp; B</h1>\n<h2>&lt;tag&gt;&nbsp;</h2>"
+        ))
+        
+        self.assertEqual([h['text'] for h in headings], ['A & B', '<tag>'])
+    
+    def test_inline_markup_falls_back(self):
+        """测试标题中含有内联标签时交给BeautifulSoup"""
+        html_content = make_html("<h1>第一章 <em>引言</em></h1>\n<h2>背景</h2>")
+        
+        self.assertIsNone(parse_html_headings_fast(html_content))
+        
+        headings, _ = parse_html_headings(html_content)
+        self.assertEqual([h['text'] for h in headings], ['第一章 引言', '背景'])
+    
+    def test_heading_in_comment_falls_back(self):
+        """测试注释中出现标题标签时交给BeautifulSoup"""
+        html_content = make_html("<!-- <h1>旧标题</h1> -->\n<h1>新标题</h1>")
+        
+        self.assertIsNone(parse_html_headings_fast(html_content))
+        
+        headings, _ = parse_html_headings(html_content)
+        self.assertEqual([h['text'] for h in headings], ['新标题'])
+    
+    def test_quoted_attribute_with_angle_bracket(self):
+        """测试属性值中的 > 不被当作开始标签的结束"""
+        html_content = make_html(
+            '<h1 title="a>b">Title</h1>\n<h2 data-note=\'x id=y\' id="old">Sub</h2>'
+        )
+        fast = parse_html_headings_fast(html_content)
+        self.assertIsNotNone(fast)
+        
+        headings, updated_html = fast
+        self.assertEqual(heading_fields(headings), heading_fields(parse_with_soup(html_content)[0]))
+        self.assertEqual([h['text'] for h in headings], ['Title', 'Sub'])
+        self.assertIn('<h1 title="a>b" id="heading-0-Title">Title</h1>', updated_html)
+        self.assertIn('<h2 data-note=\'x id=y\' id="heading-1-Sub">Sub</h2>', updated_html)
+    
+    def test_quoted_attribute_with_inline_markup(self):
+        """测试交给BeautifulSoup时，属性值中的 > 不影响写入ID"""
+        html_content = make_html('<h1 title="a>b">第一章 <em>引言</em></h1>')
+        
+        headings, updated_html = parse_html_headings(html_content)
+        
+        self.assertEqual([h['text'] for h in headings], ['第一章 引言'])
+        self.assertIn('<h1 title="a>b" id="heading-0-第一章引言">第一章 <em>引言</em></h1>', updated_html)
+    
+    def test_unclosed_heading_falls_back(self):
+        """测试缺少结束标签时交给BeautifulSoup"""
+        self.assertIsNone(parse_html_headings_fast(make_html("<h1>标题\n<p>正文</p>")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+单元测试 - common.py
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, PROJECT_DIR)
+
+from common import get_html_hash, link_tree, restore_cached_html, save_html_cache
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def write(path, content):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+class TestHtmlCache(unittest.TestCase):
+    """测试HTML转换结果的缓存"""
+    
+    INPUTS = (b'# markdown', b'<html>$body$</html>', b'regex')
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_file = os.path.join(self.temp_dir, "book.html")
+        write(self.output_file, "<h1>markdown</h1>")
+        save_html_cache(self.output_file, get_html_hash(*self.INPUTS))
+    
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_hit_restores_converted_html(self):
+        """测试输入未变化时命中缓存，恢复被后续步骤修改前的HTML"""
+        write(self.output_file, "<nav>目录</nav><h1>markdown</h1>")
+        
+        self.assertTrue(restore_cached_html(self.output_file, get_html_hash(*self.INPUTS)))
+        self.assertEqual(read(self.output_file), "<h1>markdown</h1>")
+    
+    def test_miss_when_input_changes(self):
+        """测试Markdown、模板或转换方式任一变化时不命中"""
+        markdown, template, renderer = self.INPUTS
+        for inputs in [
+            (b'# changed', template, renderer),
+            (markdown, b'<html><main>$body$</main></html>', renderer),
+            (markdown, template, b'mistune'),
+        ]:
+            with self.subTest(inputs=inputs):
+                self.assertFalse(restore_cached_html(self.output_file, get_html_hash(*inputs)))
+    
+    def test_parts_are_separated(self):
+        """测试输入之间的边界参与哈希，内容移动到相邻部分时哈希不同"""
+        self.assertNotEqual(get_html_hash(b'ab', b'c'), get_html_hash(b'a', b'bc'))
+    
+    def test_miss_when_cache_file_missing(self):
+        """测试缓存文件或哈希文件缺失时不命中"""
+        html_hash = get_html_hash(*self.INPUTS)
+        
+        os.remove(f"{self.output_file}.cache")
+        self.assertFalse(restore_cached_html(self.output_file, html_hash))
+        
+        save_html_cache(self.output_file, html_hash)
+        os.remove(f"{self.output_file}.hash")
+        self.assertFalse(restore_cached_html(self.output_file, html_hash))
+
+
+class TestLinkTree(unittest.TestCase):
+    """测试以硬链接方式发布图片目录"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.temp_dir, "images")
+        self.dst = os.path.join(self.temp_dir, "output", "images")
+        os.makedirs(os.path.join(self.src, "sub"))
+        write(os.path.join(self.src, "a.png"), "a")
+        write(os.path.join(self.src, "sub", "b.png"), "b")
+    
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_files_hard_linked(self):
+        """测试文件以硬链接发布，子目录递归发布"""
+        link_tree(self.src, self.dst)
+        
+        for name in ["a.png", os.path.join("sub", "b.png")]:
+            self.assertTrue(os.path.samefile(os.path.join(self.src, name), os.path.join(self.dst, name)))
+    
+    def test_copy_when_link_fails(self):
+        """测试无法硬链接时回退为复制"""
+        with patch('os.link', side_effect=OSError("跨文件系统")):
+            link_tree(self.src, self.dst)
+        
+        target = os.path.join(self.dst, "sub", "b.png")
+        self.assertEqual(read(target), "b")
+        self.assertFalse(os.path.samefile(os.path.join(self.src, "sub", "b.png"), target))
+    
+    def test_changes_republished(self):
+        """测试再次发布时同步新增和删除的文件，包括子目录中的变化"""
+        link_tree(self.src, self.dst)
+        
+        os.remove(os.path.join(self.src, "a.png"))
+        write(os.path.join(self.src, "sub", "c.png"), "c")
+        link_tree(self.src, self.dst)
+        
+        self.assertEqual(sorted(os.listdir(self.dst)), ["sub"])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dst, "sub"))), ["b.png", "c.png"])
+
+
+if __name__ == '__main__':
+    unittest.main()
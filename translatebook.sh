@@ -21,6 +21,7 @@ INPUT_LANG="auto"
 OUTPUT_LANG="zh"
 CUSTOM_PROMPT=""
 TEMP_DIR=""
+CONCURRENCY=""
 CLEANUP=false
 VERBOSE=false
 
@@ -41,6 +42,7 @@ show_help() {
     --olang             输出语言 (默认: zh)
     -p, --prompt        自定义翻译提示
     --temp-dir          指定临时目录
+    -j, --concurrency   同时翻译的页面数 (默认: 8)
     --cleanup           完成后清理临时文件
     -v, --verbose       详细输出
     -h, --help          显示此帮助信息
@@ -206,6 +208,10 @@ parse_arguments() {
                 TEMP_DIR="$2"
                 shift 2
                 ;;
+            -j|--concurrency)
+                CONCURRENCY="$2"
+                shift 2
+                ;;
             --cleanup)
                 CLEANUP=true
                 shift
@@ -251,6 +257,7 @@ show_config() {
     echo "  🎯 输出语言: $OUTPUT_LANG"
     echo "  💬 自定义提示: ${CUSTOM_PROMPT:-'无'}"
     echo "  📁 临时目录: ${TEMP_DIR:-'自动生成'}"
+    echo "  ⚡ 并发数: ${CONCURRENCY:-8}"
     echo "  🧹 自动清理: $CLEANUP"
     echo "  📝 详细输出: $VERBOSE"
     echo ""
@@ -302,6 +309,10 @@ run_translation_pipeline() {
         prepare_args+=("--temp-dir" "$TEMP_DIR")
     fi
     
+    if [ -n "$CONCURRENCY" ]; then
+        prepare_args+=("--concurrency" "$CONCURRENCY")
+    fi
+    
     log_verbose "执行: python3 01_prepare_env.py ${prepare_args[*]}"
     
     if ! python3 "$SCRIPT_DIR/01_prepare_env.py" "${prepare_args[@]}"; then